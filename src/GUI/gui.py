@@ -6,7 +6,10 @@ import os
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 import math
 import json
+import time
 from algorithms import my_algorithms as alg
+from algorithms import np_algorithms as np_alg
+from algorithms import ellipse_algorithms as ellipse_alg
 from graphics_item.item_factory import ItemFactory
 from graphics_item.pp_item import PPItem
 from utils.command import Command
@@ -15,7 +18,9 @@ from utils.paste_command import PasteCommand
 from utils.undo_command import UndoCommand
 from utils.add_command import AddCommand
 from utils.remove_command import RemoveCommand
+from utils.grid_command import GridCommand
 from utils.command_history import CommandHistory
+from utils.input_latency import InputLatency
 from typing import Optional
 from PyQt5.QtWidgets import (
     QApplication,
@@ -38,7 +43,7 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QPainter, QMouseEvent, QColor, QKeyEvent, QWheelEvent, QIntValidator, QDoubleValidator, QPen, \
     QIcon
-from PyQt5.QtCore import QRectF, Qt
+from PyQt5.QtCore import QRectF, Qt, QTimer
 
 import numpy as np
 from PIL import Image
@@ -62,8 +67,28 @@ class PPCanvas(QGraphicsView):
 
         item_factory: factory of items
         clipboard: item to paste
+        fillable_types: item types that support set_fill
+        lod_detail: items are drawn simplified when the view scale is below it
+        lod_box_size: items smaller than it on screen (in pixels) are drawn as a box
+        damaged_items: items changed in this frame, with their scene rects before the change
+        damaged_rect: other scene area to repaint in this frame
+        damage_margin: simplified painting may reach a little outside the bounding rect, so damaged rects grow by it
+        frame_timer: single-shot timer of the next frame, which applies the pending input and repaints
+        frame_interval: min interval between two frames (ms), from the refresh rate of the screen
+        pending_move: latest mouse position (in scene) not applied yet
+        pending_keys: transform keys not applied yet, [[item, key, count], ...]
+        latency: statistics of input latency
     """
 
+    fillable_types = ('polygon', 'ellipse')  # 圆形的item_type也是'ellipse'
+    lod_detail = 0.5  # 细节层次的阈值，见PPItem.level_of_detail
+    lod_box_size = 3
+    damage_margin = 6  # 简化绘制时像素点合并到块的中心，可能略微伸出包围框
+    # 变换选中图元的按键：平移(dx, dy)，以中心缩放的倍数，以中心旋转的角度
+    transform_keys = {Qt.Key_W: ('translate', (0, -5)), Qt.Key_A: ('translate', (-5, 0)),
+                      Qt.Key_S: ('translate', (0, 5)), Qt.Key_D: ('translate', (5, 0)),
+                      Qt.Key_Q: ('scale', 1.1), Qt.Key_E: ('scale', 0.9), Qt.Key_R: ('rotate', 10)}
+
     def __init__(self, *args):
         super().__init__(*args)
         self.setFocusPolicy(Qt.StrongFocus)
@@ -98,6 +123,92 @@ class PPCanvas(QGraphicsView):
         # for mix items
         self.compound_items = set()
 
+        # 需要重绘的区域，每一帧合并后只重绘一次
+        self.damaged_items = {}
+        self.damaged_rect = QRectF()
+
+        # 输入事件先记录下来，在下一帧合并后再应用，帧之间的间隔不小于屏幕的刷新间隔
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setSingleShot(True)
+        self.frame_timer.timeout.connect(self.next_frame)
+        self.frame_interval = 1000 / (QApplication.primaryScreen().refreshRate() or 60)
+        self.last_frame = 0.0
+        self.pending_move = None
+        self.pending_keys = []
+        self.input_started = None  # 最早的尚未应用的输入事件到达的时间
+        self.input_count = 0
+        self.latency = InputLatency()
+
+    def damage(self, rect: QRectF):
+        '''
+        标记场景中的一块区域需要重绘
+        :param rect: 场景坐标中的区域
+        '''
+        self.damaged_rect = self.damaged_rect.united(rect)
+        self.schedule_frame()
+
+    def damage_item(self, item):
+        '''
+        图元的外观即将改变时由图元调用：记录它在这一帧中第一次改变之前的范围，改变之后的范围在重绘时再取
+        '''
+        if item not in self.damaged_items:
+            self.damaged_items[item] = item.sceneBoundingRect()
+        self.schedule_frame()
+
+    def schedule_frame(self):
+        '''
+        安排下一帧：距离上一帧不足一个刷新间隔时推迟到间隔结束，已经安排过时什么也不做
+        '''
+        if not self.frame_timer.isActive():
+            delay = self.last_frame + self.frame_interval - time.perf_counter() * 1000
+            self.frame_timer.start(max(0, math.ceil(delay)))
+
+    def next_frame(self):
+        self.last_frame = time.perf_counter() * 1000
+        self.apply_pending_input()
+        self.flush_damage()
+
+    def flush_damage(self):
+        '''
+        重绘这一帧中改变过的区域：各图元改变前后的包围框与其他区域的并集
+        '''
+        rect = self.damaged_rect
+        for item, old_rect in self.damaged_items.items():
+            rect = rect.united(old_rect)
+            if item.scene() is self.scene():
+                rect = rect.united(item.sceneBoundingRect())
+        self.damaged_items = {}
+        self.damaged_rect = QRectF()
+        if not rect.isEmpty():
+            m = self.damage_margin
+            self.updateScene([rect.adjusted(-m, -m, m, m)])
+
+    def input_received(self):
+        if self.input_started is None:
+            self.input_started = time.perf_counter()
+        self.input_count += 1
+        self.schedule_frame()
+
+    def apply_pending_input(self):
+        '''
+        应用尚未应用的输入：只取最新的鼠标位置，相邻的相同按键合并为一次变换。
+        下一帧到来之前需要用到最新状态的操作（鼠标按下、其他按键、命令、保存）会先调用它
+        '''
+        if self.pending_move is not None:
+            x, y = self.pending_move
+            self.pending_move = None
+            self.apply_mouse_move(x, y)
+        pending_keys, self.pending_keys = self.pending_keys, []
+        for item, key, count in pending_keys:
+            self.apply_transform_key(item, key, count)
+        if self.input_started is not None:
+            self.latency.record(self.input_started, self.input_count)
+            self.input_started = None
+            self.input_count = 0
+
+    def get_latency(self):
+        return self.latency
+
     def set_clipboard(self, item):
         self.__clipboard = item
         return self
@@ -106,6 +217,7 @@ class PPCanvas(QGraphicsView):
         return self.__clipboard
 
     def execute_command(self, command: Command):
+        self.apply_pending_input()
         if command.execute():
             self.history.push_command(command)
 
@@ -136,7 +248,6 @@ class PPCanvas(QGraphicsView):
         self.reset_selection()
         self.scene().removeItem(self.item_dict[id])
         del self.item_dict[id]
-        self.updateScene([self.sceneRect()])
 
     def add_temp_item(self):
         if self.temp_item is None:
@@ -159,9 +270,6 @@ class PPCanvas(QGraphicsView):
         self.item_dict[id] = item
         item.setFinish(True)
         self.scene().addItem(item)
-        self.scene().update()
-        self.update()
-        self.updateScene([self.sceneRect()])
 
     def add_text_item(self, _text:str = "this is demo"):
         self.setStatus('mouse')
@@ -206,9 +314,29 @@ class PPCanvas(QGraphicsView):
         self.status_changed()
         for key, item in self.item_dict.items():
             self.scene().addItem(self.item_dict[key])
-        self.updateScene([self.sceneRect()])
-        self.scene().update()
-        self.updateScene([self.sceneRect()])
+
+    def duplicate_as_grid(self, rows, columns, dx, dy):
+        '''
+        把选中的图元复制为rows行columns列的网格，选中的图元位于左上角，相邻两列（行）之间平移dx（dy）
+        复制出的图元都是同一个母版的实例，共享几何数据和光栅化结果
+        :return: (bool) 是否复制了图元
+        '''
+        if not self.has_select_item() or rows * columns <= 1:
+            return False
+        source = self.selected_item
+        prototype = source.make_prototype() if isinstance(source, PPItem) else None
+        for i in range(rows):
+            for j in range(columns):
+                if i == 0 and j == 0:
+                    continue
+                if prototype is None:  # 文字不支持实例化，直接复制
+                    item = source.clone()
+                    item.translate(j * dx, i * dy)
+                else:
+                    item = prototype.instantiate(j * dx, i * dy)
+                new_id = self.get_id()
+                self.add_item(item.setId(new_id), new_id)
+        return True
 
     def remove_all(self):
         self.status_changed()
@@ -219,7 +347,6 @@ class PPCanvas(QGraphicsView):
             cnt += 1
         print("remove " + str(cnt) + " items.")
         self.item_dict.clear()
-        self.updateScene([self.sceneRect()])
 
     def has_select_item(self):
         '''
@@ -237,6 +364,7 @@ class PPCanvas(QGraphicsView):
         保存当前画布中的item信息为json文件
         :param save_path: 保存的文件名
         '''
+        self.apply_pending_input()
         self.status_changed()
         dump_dict = {}
         for index, item in self.item_dict.items():
@@ -250,6 +378,7 @@ class PPCanvas(QGraphicsView):
         save_file.close()
 
     def save_all_as_bmp(self, save_path):
+        self.apply_pending_input()
         weight, height = self.size().width(), self.size().height()
         print(weight, height)
         canvas = np.zeros([height, weight, 3], np.uint8)
@@ -257,11 +386,48 @@ class PPCanvas(QGraphicsView):
         self.status_changed()
         dump_dict = {}
 
-        def axis_valid(_x, _y):
-            return 0 <= _x < weight and 0 <= _y < height
+        def put_pixels(pixels, colors):
+            '''
+            批量写入像素，越界的点直接丢弃
+            :param pixels: 像素点坐标
+            :param colors: 单个颜色，或与pixels一一对应的颜色数组（同一位置以最后写入的颜色为准）
+            '''
+            pixels = np.asarray(pixels, np.int64).reshape(-1, 2)
+            xs, ys = pixels[:, 0], pixels[:, 1]
+            valid = (0 <= xs) & (xs < weight) & (0 <= ys) & (ys < height)
+            flat = (ys * weight + xs)[valid]
+            colors = np.asarray(colors, np.uint8)
+            if colors.ndim == 2:
+                colors = colors[valid]
+                _, last = np.unique(flat[::-1], return_index=True)
+                last = len(flat) - 1 - last
+                flat, colors = flat[last], colors[last]
+            canvas.reshape(-1, 3)[flat] = colors
+
+        canvas_rect = (0, 0, weight - 1, height - 1)
+        # 连续的、使用同一算法的线段和多边形边先缓存起来，再一次性批量光栅化
+        pending_lines = {'algorithm': None, 'segments': [], 'colors': []}
+
+        def flush_lines():
+            if len(pending_lines['segments']) > 0:
+                pixels, offsets = np_alg.draw_lines(np.concatenate(pending_lines['segments']),
+                                                    pending_lines['algorithm'], canvas_rect)
+                put_pixels(pixels, np.repeat(np.concatenate(pending_lines['colors']), np.diff(offsets), axis=0))
+            pending_lines['segments'] = []
+            pending_lines['colors'] = []
+
+        def add_lines(segments, algorithm, color):
+            segments = np_alg.cull_segments(segments, canvas_rect)  # 完全位于画布外的线段不再光栅化
+            if algorithm != pending_lines['algorithm']:
+                flush_lines()
+                pending_lines['algorithm'] = algorithm
+            pending_lines['segments'].append(segments)
+            pending_lines['colors'].append(np.tile(np.asarray(color, np.uint8), (len(segments), 1)))
 
         for index, item in self.item_dict.items():
             ans = item.dump_as_dict()
+            if ans is None:
+                continue
             dump_dict[index] = ans
         for item in dump_dict.values():
             item_type = item["type"]
@@ -269,38 +435,39 @@ class PPCanvas(QGraphicsView):
             algorithm = item["algorithm"]
             color = item["color"]
             if item_type == 'line':
-                pixels = alg.draw_line(p_list, algorithm)
-                for x, y in pixels:
-                    if not axis_valid(x, y):
-                        continue
-                    canvas[y, x] = color
+                add_lines(np_alg.polyline_segments(p_list, False), algorithm, color)
             elif item_type == 'polygon':
-                pixels = alg.draw_polygon(p_list, algorithm)
-                for x, y in pixels:
-                    if not axis_valid(x, y):
-                        continue
-                    canvas[y, x] = color
+                add_lines(np_alg.polyline_segments(p_list, True), algorithm, color)
                 if item["fill"]:
-                    fill_pixels = alg.polygon_fill(p_list, 1000)
-                    fill_color = item["fill_color"]
-                    for x, y in fill_pixels:
-                        if not axis_valid(x, y):
-                            continue
-                        canvas[y, x] = fill_color
+                    flush_lines()
+                    # 只在多边形的包围盒与画布相交的区域内填充，一次性写入
+                    points = np.asarray(p_list, np.int64)
+                    x_min, y_min = np.maximum(points.min(axis=0), 0)
+                    x_max, y_max = np.minimum(points.max(axis=0) + 1, [weight, height])
+                    if x_min < x_max and y_min < y_max:
+                        mask = np.zeros((y_max - y_min, x_max - x_min), bool)
+                        np_alg.polygon_fill_mask(p_list, mask, x_min, y_min)
+                        canvas[y_min:y_max, x_min:x_max][mask] = item["fill_color"]
             elif item_type == 'ellipse':
-                pixels = alg.draw_ellipse(p_list)
-                for x, y in pixels:
-                    if not axis_valid(x, y):
-                        continue
-                    canvas[y, x] = color
+                flush_lines()
+                if item.get("fill"):
+                    # 按行填充，只在填充区间的包围盒与画布相交的区域内写入掩码
+                    spans = np.asarray(ellipse_alg.ellipse_spans(p_list, canvas_rect, item.get("angle", 0)),
+                                       np.int64).reshape(-1, 3)
+                    x_min, y_min = max(spans[:, 1].min(initial=weight), 0), max(spans[:, 0].min(initial=height), 0)
+                    x_max = min(spans[:, 2].max(initial=-1) + 1, weight)
+                    y_max = min(spans[:, 0].max(initial=-1) + 1, height)
+                    if x_min < x_max and y_min < y_max:
+                        mask = np.zeros((y_max - y_min, x_max - x_min), bool)
+                        np_alg.spans_to_mask(spans, mask, x_min, y_min)
+                        canvas[y_min:y_max, x_min:x_max][mask] = item["fill_color"]
+                put_pixels(ellipse_alg.draw_ellipse(p_list, canvas_rect, item.get("angle", 0)), color)
             elif item_type == 'curve':
                 if algorithm == 'B-spline' and len(p_list) < 4:
                     continue
-                pixels = alg.draw_curve(p_list, algorithm)
-                for x, y in pixels:
-                    if not axis_valid(x, y):
-                        continue
-                    canvas[y, x] = color
+                flush_lines()
+                put_pixels(np_alg.draw_curve(p_list, algorithm, item.get("tolerance")), color)
+        flush_lines()
         Image.fromarray(canvas).save(save_path, 'bmp')
 
     def load_json(self, json_file_path):
@@ -334,9 +501,13 @@ class PPCanvas(QGraphicsView):
                 new_item.setZValue(item['zvalue'])
                 new_item.setColor(QColor(item['color'][0], item['color'][1], item['color'][2]))
                 new_item.setId(self.get_id())
-                if new_item.item_type == 'polygon':
-                    if item["fill"]:
+                if new_item.item_type in self.fillable_types:
+                    if item.get("fill"):
                         new_item.set_fill(QColor(item['fill_color'][0], item['fill_color'][1], item['fill_color'][2]))
+                if new_item.item_type == 'curve':
+                    new_item.set_tolerance(item.get('tolerance'))
+                if new_item.item_type == 'ellipse':
+                    new_item.set_angle(item.get('angle', 0))
                 # self.add_item_aux(key, new_item)
                 self.add_item(new_item)
         except:
@@ -356,7 +527,7 @@ class PPCanvas(QGraphicsView):
 
         self.clip_rect = ClipRectangle(x_min, y_min, x_max - x_min, y_max - y_min)
         self.scene().addItem(self.clip_rect)
-        self.updateScene([self.sceneRect()])
+        self.damage(self.clip_rect.sceneBoundingRect())
 
     def remove_clip_rect(self):
         if self.clip_rect is None:
@@ -371,6 +542,7 @@ class PPCanvas(QGraphicsView):
         if self.clip_rect is None:
             print("clip rect should not be None.")
             return
+        self.damage(self.clip_rect.sceneBoundingRect())
 
         if x_min > x_max:
             x_min, x_max = x_max, x_min
@@ -381,8 +553,7 @@ class PPCanvas(QGraphicsView):
             set_y(y_min). \
             set_w(x_max - x_min). \
             set_h(y_max - y_min)
-
-        self.updateScene([self.sceneRect()])
+        self.damage(self.clip_rect.sceneBoundingRect())
 
     def setPenColor(self, color: QColor):
         self.pen_color = color
@@ -407,42 +578,67 @@ class PPCanvas(QGraphicsView):
             return
 
         self.selected_item.translate(dx, dy)
-        self.updateScene([self.sceneRect()])
 
     def rotate(self, xc, yc, r):
         if not self.has_select_item():
             return
 
         self.selected_item.rotate(xc, yc, r)
-        self.updateScene([self.sceneRect()])
 
     def scale(self, xc, yc, s):
         if not self.has_select_item():
             return
 
         self.selected_item.scale(xc, yc, s)
-        self.updateScene([self.sceneRect()])
 
     def clip(self, x_min, y_min, x_max, y_max, algorithm):
         if not self.has_select_item():
             return
-        # TODO: modify the interface
-        cliped_p_list = alg.clip(self.selected_item.p_list, x_min, y_min, x_max,
-                                 y_max, algorithm)
+        if self.selected_item.item_type == 'polygon':
+            cliped_p_list = alg.round_points(alg.clip_polygon_sutherland_hodgman(self.selected_item.p_list,
+                                                                                 x_min, y_min, x_max, y_max))
+            if len(cliped_p_list) > 1 and cliped_p_list[0] == cliped_p_list[-1]:
+                cliped_p_list.pop()
+            if len(cliped_p_list) < 3:
+                cliped_p_list = None
+        elif self.selected_item.item_type == 'curve':
+            return self.clip_curve(x_min, y_min, x_max, y_max)
+        else:
+            # TODO: modify the interface
+            cliped_p_list = alg.clip(self.selected_item.p_list, x_min, y_min, x_max,
+                                     y_max, algorithm)
         if cliped_p_list is None:
             self.remove_item(self.selected_id)
             self.selected_id = ''
             return True
         else:
             self.selected_item.p_list = cliped_p_list
-            self.updateScene([self.sceneRect()])
+            self.selected_item.geometry_changed()
             return False
 
+    def clip_curve(self, x_min, y_min, x_max, y_max):
+        '''
+        裁剪曲线：将曲线展平为折线后裁剪，窗口内的每一段折线成为一条经过其顶点的分段Bezier曲线，原曲线被删除
+        :return: True，原来选中的图元总是被删除
+        '''
+        curve = self.selected_item
+        polyline = alg.flatten_curve(curve.p_list, curve.algorithm)
+        for piece in alg.clip_polyline(polyline, x_min, y_min, x_max, y_max):
+            p_list = alg.round_points(piece)
+            if len(p_list) < 2:
+                continue
+            new_id = self.get_id()
+            new_item = self.item_factory.get_item(new_id, 'curve', p_list, 'Bezier-piecewise')
+            new_item.setColor(curve.color)
+            self.add_item(new_item, new_id)
+        self.remove_item(self.selected_id)
+        self.selected_id = ''
+        return True
+
     def fill_polygon(self, fill_color):
-        if self.selected_item is None or self.selected_item.item_type != 'polygon':
+        if self.selected_item is None or self.selected_item.item_type not in self.fillable_types:
             return
         self.selected_item.set_fill(fill_color)
-        self.updateScene([self.sceneRect()])
 
     def finish_draw_polygon(self):
         if self.status != 'polygon' or self.temp_item is None:
@@ -485,10 +681,8 @@ class PPCanvas(QGraphicsView):
         '''
         if self.status == 'polygon':
             self.finish_draw_polygon()
-            self.updateScene([self.sceneRect()])
         elif self.status == 'curve':
             self.finish_draw_curve()
-            self.updateScene([self.sceneRect()])
 
     def reset_selection(self):
         if self.has_select_item():
@@ -512,7 +706,6 @@ class PPCanvas(QGraphicsView):
             try:
                 self.selected_item.setSelect(False)
                 self.selected_item.setZValue(int(self.selected_id))
-                self.selected_item.update()
             except KeyError:
                 print("KeyError: {0} is not in the item dict.".format(self.selected_id))
             self.selected_item = None
@@ -526,9 +719,7 @@ class PPCanvas(QGraphicsView):
         self.item_dict[selected].setSelect(True)
         self.item_dict[selected].setZValue(self.max_z + 1)  # 将当前的图元放在最顶层
         self.max_z += 1
-        self.item_dict[selected].update()  # 更新bounding box的绘制
         self.setStatus('mouse')
-        self.updateScene([self.sceneRect()])
 
     def setStatus(self, status):
         '''
@@ -543,10 +734,8 @@ class PPCanvas(QGraphicsView):
         if event.button() == Qt.RightButton:
             if self.status == 'polygon' and self.temp_item is not None:
                 self.finish_draw_polygon()
-                self.updateScene([self.sceneRect()])
             elif self.status == 'curve' and self.temp_item is not None:
                 self.finish_draw_curve()
-                self.updateScene([self.sceneRect()])
             return
 
         if event.button() != Qt.LeftButton:
@@ -572,7 +761,7 @@ class PPCanvas(QGraphicsView):
                 if self.temp_item is None:
                     raise Exception("the temp item shouldn't be None!")
                 self.queue_pos += 1
-                self.temp_item.p_list.append([x, y])
+                self.temp_item.append_point([x, y])
         elif self.status == 'ellipse':
             p_list = [[x, y], [x, y]]
             self.temp_item = self.item_factory.get_item(self.temp_id, self.status, p_list, self.temp_algorithm)
@@ -589,15 +778,13 @@ class PPCanvas(QGraphicsView):
                 if self.temp_item is None:
                     raise Exception("the temp item shouldn't be None!")
                 self.queue_pos += 1
-                self.temp_item.p_list.append([x, y])
+                self.temp_item.append_point([x, y])
         elif self.status == 'triangle' or self.status == 'square' or self.status == 'circle':
-            p_list = [[x, y]]
-            self.temp_item = self.item_factory.get_item(self.temp_id, self.status, p_list, self.temp_algorithm)
+            self.temp_item = self.item_factory.get_preset(self.temp_id, self.status, x, y, self.temp_algorithm)
             self.temp_item.setColor(self.pen_color)
             self.scene().addItem(self.temp_item)
             self.add_temp_item()
             self.finish_draw()
-        self.updateScene([self.sceneRect()])
         if self.status == 'mouse':
             selected_item = self.itemAt(x, y)
             if selected_item is not None:
@@ -614,55 +801,61 @@ class PPCanvas(QGraphicsView):
             if selected_item is not None:
                 selected_item.setSelect(True)
                 self.add_compound_items(selected_item)
-                self.scene().update()
-                self.updateScene([self.sceneRect()])
             else:
                 self.reset_selection()
 
     def mousePressEvent(self, event: QMouseEvent) -> None:
+        self.apply_pending_input()
         self.__mouse_press_handle(event)
         super().mousePressEvent(event)
 
     def mouseDoubleClickEvent(self, event: QMouseEvent) -> None:
+        self.apply_pending_input()
         self.__mouse_press_handle(event)
         super().mouseDoubleClickEvent(event)
 
     def mouseMoveEvent(self, event: QMouseEvent) -> None:
         if not (event.buttons() & Qt.LeftButton):
             return
+        if self.status != 'mouse' and self.temp_item is None:
+            return
 
+        # 只记录最新的位置，在下一帧应用；一帧之内到达的多个移动事件只有最后一个生效
         pos = self.mapToScene(event.localPos().toPoint())
-        x = int(pos.x())
-        y = int(pos.y())
+        self.pending_move = (int(pos.x()), int(pos.y()))
+        self.input_received()
+        super().mouseMoveEvent(event)
 
+    def apply_mouse_move(self, x, y):
+        '''
+        按住左键移动到(x, y)的效果：改变正在绘制的图元的终点，或者拖动选中图元的控制点或整个图元
+        '''
         if self.status != 'mouse' and self.temp_item is None:
             return
         if self.status == 'line':
-            self.temp_item.p_list[1] = [x, y]  # 不断改变终点
+            self.temp_item.set_point(1, [x, y])  # 不断改变终点
         elif self.status == 'polygon':
             if len(self.temp_item.p_list) == 1:  # 第一个节点不允许改变位置
                 self.queue_pos += 1
-                self.temp_item.p_list.append([x, y])
+                self.temp_item.append_point([x, y])
             else:
-                self.temp_item.p_list[self.queue_pos] = [x, y]  # 不断改变终点
+                self.temp_item.set_point(self.queue_pos, [x, y])  # 不断改变终点
         elif self.status == 'ellipse':
-            self.temp_item.p_list[1] = [x, y]
+            self.temp_item.set_point(1, [x, y])
             self.temp_item.setPaintList()
         elif self.status == 'curve':
             if len(self.temp_item.p_list) == 1:  # 第一个节点不允许改变位置
                 self.queue_pos += 1
-                self.temp_item.p_list.append([x, y])
+                self.temp_item.append_point([x, y])
             else:
-                self.temp_item.p_list[self.queue_pos] = [x, y]  # 不断改变终点
+                self.temp_item.set_point(self.queue_pos, [x, y])  # 不断改变终点
 
         if self.status == 'mouse':
             if self.selected_item is not None:
                 self.selected_item.update_control_point(x, y)
 
-        self.updateScene([self.sceneRect()])
-        super().mouseMoveEvent(event)
-
     def mouseReleaseEvent(self, event: QMouseEvent) -> None:
+        self.apply_pending_input()
         self.unsetCursor()
         if event.button() != Qt.LeftButton:
             return
@@ -691,10 +884,17 @@ class PPCanvas(QGraphicsView):
         if self.status == 'mouse':
             if self.selected_item is not None:
                 self.selected_item.release_control_point()
-        self.updateScene([self.sceneRect()])
         super().mouseReleaseEvent(event)
 
     def keyPressEvent(self, event: QKeyEvent) -> None:
+        # 变换按键（通常是自动重复的）在下一帧合并后再应用，其余按键需要先应用之前的输入
+        if event.key() in self.transform_keys and self.has_select_item() and \
+                QApplication.keyboardModifiers() != Qt.ControlModifier:
+            self.queue_transform_key(event.key())
+            super().keyPressEvent(event)
+            return
+        self.apply_pending_input()
+
         if event.key() == Qt.Key_Space:
             if self.status == 'polygon' and self.temp_item is not None:
                 self.finish_draw_polygon()
@@ -706,26 +906,8 @@ class PPCanvas(QGraphicsView):
             self.setStatus('compound')  # TODO: may be exclude all other events?
             print("begin compound")
         # 使用键盘变换当前选中的图元
-        if self.has_select_item():
-            if event.key() == Qt.Key_W:
-                self.translate(0, -5)
-            elif event.key() == Qt.Key_A:
-                self.translate(-5, 0)
-            elif event.key() == Qt.Key_S:
-                self.translate(0, 5)
-            elif event.key() == Qt.Key_D:
-                self.translate(5, 0)
-
-            elif event.key() == Qt.Key_Q:
-                center_x, center_y = self.selected_item.get_center()
-                self.scale(int(center_x), int(center_y), 1.1)
-            elif event.key() == Qt.Key_E:
-                center_x, center_y = self.selected_item.get_center()
-                self.scale(int(center_x), int(center_y), 0.9)
-
-            elif event.key() == Qt.Key_R:
-                center_x, center_y = self.selected_item.get_center()
-                self.rotate(int(center_x), int(center_y), 10)
+        if self.has_select_item() and event.key() in self.transform_keys:
+            self.apply_transform_key(self.selected_item, event.key())
 
         # ctrl 组合键处理
         if QApplication.keyboardModifiers() == Qt.ControlModifier:
@@ -743,9 +925,34 @@ class PPCanvas(QGraphicsView):
                 command = UndoCommand(self, self)
                 self.execute_command(command)
 
-        self.updateScene([self.sceneRect()])
         super().keyPressEvent(event)
 
+    def queue_transform_key(self, key):
+        '''
+        记录一次变换按键，与上一次相同（同一个图元、同一个键）时只增加次数
+        '''
+        if self.pending_keys and self.pending_keys[-1][0] is self.selected_item and self.pending_keys[-1][1] == key:
+            self.pending_keys[-1][2] += 1
+        else:
+            self.pending_keys.append([self.selected_item, key, 1])
+        self.input_received()
+
+    def apply_transform_key(self, item, key, count=1):
+        '''
+        把按count次key的变换应用到item上：平移量乘以count；缩放和旋转之后取整的包围框中心会移动，
+        与逐次按键一样每次都以当时的中心变换（只是矩阵相乘），结果与一帧内合并了几次按键无关，重绘仍然只在下一帧进行一次
+        '''
+        kind, value = self.transform_keys[key]
+        if kind == 'translate':
+            item.translate(value[0] * count, value[1] * count)
+            return
+        for _ in range(count):
+            center_x, center_y = item.get_center()
+            if kind == 'scale':
+                item.scale(int(center_x), int(center_y), value)
+            else:
+                item.rotate(int(center_x), int(center_y), value)
+
     def keyReleaseEvent(self, event: QKeyEvent) -> None:
         if event.key() == Qt.Key_Alt:
             assert self.status == "compound"
@@ -764,18 +971,22 @@ class ClipRectangle(QGraphicsItem):
         self.h = h
 
     def set_x(self, x):
+        self.prepareGeometryChange()
         self.x = x
         return self
 
     def set_y(self, y):
+        self.prepareGeometryChange()
         self.y = y
         return self
 
     def set_w(self, w):
+        self.prepareGeometryChange()
         self.w = w
         return self
 
     def set_h(self, h):
+        self.prepareGeometryChange()
         self.h = h
         return self
 
@@ -1007,6 +1218,88 @@ class ScaleWidget(QWidget):
         self.no_pushbuuton.clicked.connect(self.close)
 
 
+class GridWidget(QWidget):
+    def __init__(self, canvas=None):
+        super().__init__()
+        self.canvas = canvas
+        self.init_ui()
+        self.init_operation()
+
+    def init_ui(self):
+        self.setWindowTitle('网格复制')
+        self.init_componets()
+        self.init_layout()
+        self.setWindowFlags(Qt.WindowCloseButtonHint | Qt.WindowStaysOnTopHint)
+        self.setWindowModality(Qt.ApplicationModal)
+
+    def init_componets(self):
+        self.rows_label = QLabel('行数', self)
+        self.columns_label = QLabel('列数', self)
+        self.dx_label = QLabel('列间距', self)
+        self.dy_label = QLabel('行间距', self)
+
+        # 默认间距使相邻的图元之间留出10个像素
+        item = self.canvas.selected_item
+        rect = item.outline_rect() if isinstance(item, PPItem) else item.boundingRect()
+        self.rows_input_linedit = QLineEdit('3', self)
+        self.columns_input_linedit = QLineEdit('3', self)
+        self.dx_input_linedit = QLineEdit(str(math.ceil(rect.width()) + 10), self)
+        self.dy_input_linedit = QLineEdit(str(math.ceil(rect.height()) + 10), self)
+        self.count_check = QIntValidator()
+        self.count_check.setRange(1, 100)
+        self.offset_check = QIntValidator()
+        self.offset_check.setRange(-800, 800)
+        self.rows_input_linedit.setValidator(self.count_check)
+        self.columns_input_linedit.setValidator(self.count_check)
+        self.dx_input_linedit.setValidator(self.offset_check)
+        self.dy_input_linedit.setValidator(self.offset_check)
+
+        self.yes_pushbuuton = QPushButton('确定', self)
+        self.no_pushbuuton = QPushButton('关闭', self)
+
+    def init_layout(self):
+        self.label_v_layout = QVBoxLayout()
+        self.line_v_layout = QVBoxLayout()
+        self.label_line_h_layout = QHBoxLayout()
+        self.button_h_layout = QHBoxLayout()
+        self.ui_v_layout = QVBoxLayout()
+
+        self.label_v_layout.addWidget(self.rows_label)
+        self.label_v_layout.addWidget(self.columns_label)
+        self.label_v_layout.addWidget(self.dx_label)
+        self.label_v_layout.addWidget(self.dy_label)
+        self.line_v_layout.addWidget(self.rows_input_linedit)
+        self.line_v_layout.addWidget(self.columns_input_linedit)
+        self.line_v_layout.addWidget(self.dx_input_linedit)
+        self.line_v_layout.addWidget(self.dy_input_linedit)
+        self.label_line_h_layout.addLayout(self.label_v_layout)
+        self.label_line_h_layout.addLayout(self.line_v_layout)
+        self.button_h_layout.addWidget(self.yes_pushbuuton)
+        self.button_h_layout.addWidget(self.no_pushbuuton)
+        self.ui_v_layout.addLayout(self.label_line_h_layout)
+        self.ui_v_layout.addLayout(self.button_h_layout)
+        self.setLayout(self.ui_v_layout)
+
+    def init_operation(self):
+        def finish_input():
+            try:
+                rows, columns = int(self.rows_input_linedit.text()), int(self.columns_input_linedit.text())
+                dx, dy = int(self.dx_input_linedit.text()), int(self.dy_input_linedit.text())
+            except ValueError:
+                print("Null is not valid input!")
+                info = QMessageBox(self)
+                info.setText("Null is not valid input!")
+                info.setWindowTitle("警告！")
+                info.exec_()
+            else:
+                command = GridCommand(self.canvas, self.canvas).set_grid(rows, columns, dx, dy)
+                self.canvas.execute_command(command)
+                self.close()
+
+        self.yes_pushbuuton.clicked.connect(finish_input)
+        self.no_pushbuuton.clicked.connect(self.close)
+
+
 class ClipWindow(QWidget):
     def __init__(self, canvas, algorithm):
         super().__init__()
@@ -1289,6 +1582,7 @@ class PPApplication(QMainWindow):
         self.scale_window = None
         self.clip_window = None
         self.text_window = None
+        self.grid_window = None
 
         # 设置菜单栏
         menubar = self.menuBar()
@@ -1320,6 +1614,8 @@ class PPApplication(QMainWindow):
         curve_bezier_act.setIcon(QIcon('../../other_folder/other_folder/curve.ico'))
         curve_b_spline_act = curve_menu.addAction('B-spline')
         curve_b_spline_act.setIcon(QIcon('../../other_folder/other_folder/curve.ico'))
+        curve_bezier_piecewise_act = curve_menu.addAction('Bezier-piecewise')
+        curve_bezier_piecewise_act.setIcon(QIcon('../../other_folder/other_folder/curve.ico'))
         edit_menu = menubar.addMenu('编辑')
         translate_act = edit_menu.addAction('平移')
         translate_act.setIcon(QIcon('../../other_folder/other_folder/translate.ico'))
@@ -1332,8 +1628,9 @@ class PPApplication(QMainWindow):
         clip_cohen_sutherland_act.setIcon(QIcon('../../other_folder/other_folder/clip.ico'))
         clip_liang_barsky_act = clip_menu.addAction('Liang-Barsky')
         clip_liang_barsky_act.setIcon(QIcon('../../other_folder/other_folder/clip.ico'))
-        fill_act = edit_menu.addAction('填充多边形')
+        fill_act = edit_menu.addAction('填充')
         fill_act.setIcon(QIcon('../../other_folder/other_folder/paint_bucket.png'))
+        grid_act = edit_menu.addAction('网格复制')
 
         # 连接信号和槽函数
         reset_canvas_act.triggered.connect(lambda: self.reset_canvas_action())
@@ -1356,6 +1653,7 @@ class PPApplication(QMainWindow):
         ellipse_act.setIcon(QIcon('../../other_folder/other_folder/ellipse.ico'))
         curve_bezier_act.triggered.connect(lambda: self.curve_action('Bezier'))
         curve_b_spline_act.triggered.connect(lambda: self.curve_action('B-spline'))
+        curve_bezier_piecewise_act.triggered.connect(lambda: self.curve_action('Bezier-piecewise'))
         triangle_act.triggered.connect(lambda: self.triangle_action())
         square_act.triggered.connect(lambda: self.square_action())
         circle_act.triggered.connect(lambda: self.circle_action())
@@ -1366,6 +1664,7 @@ class PPApplication(QMainWindow):
         clip_cohen_sutherland_act.triggered.connect(lambda: self.clip_action('Cohen-Sutherland'))
         clip_liang_barsky_act.triggered.connect(lambda: self.clip_action('Liang-Barsky'))
         fill_act.triggered.connect(lambda: self.fill_action())
+        grid_act.triggered.connect(lambda: self.grid_action())
 
         tool_bar = self.addToolBar('选择')
         mouse_selection_act = tool_bar.addAction('选择')
@@ -1403,6 +1702,9 @@ class PPApplication(QMainWindow):
         tool_bar = self.addToolBar('B-spline曲线')
         tool_bar.addAction(curve_b_spline_act)
 
+        tool_bar = self.addToolBar('分段Bezier曲线')
+        tool_bar.addAction(curve_bezier_piecewise_act)
+
         tool_bar = self.addToolBar('平移')
         tool_bar.addAction(translate_act)
 
@@ -1532,8 +1834,8 @@ class PPApplication(QMainWindow):
         if self.canvas_widget.get_selected_item_type() is None:
             msg_box = QMessageBox(QMessageBox.Warning, '警告', '当前没有图元被选中！')
             msg_box.exec_()
-        elif self.canvas_widget.get_selected_item_type() != 'line':
-            msg_box = QMessageBox(QMessageBox.Warning, '警告', '只能对线段进行剪裁！')
+        elif self.canvas_widget.get_selected_item_type() not in ['line', 'polygon', 'curve']:
+            msg_box = QMessageBox(QMessageBox.Warning, '警告', '只能对线段、多边形和曲线进行剪裁！')
             msg_box.exec_()
         elif algorithm not in ['Liang-Barsky', 'Cohen-Sutherland']:
             msg_box = QMessageBox(QMessageBox.Warning, '警告', '使用了不正确的算法！')
@@ -1546,13 +1848,24 @@ class PPApplication(QMainWindow):
         if self.canvas_widget.get_selected_item_type() is None:
             msg_box = QMessageBox(QMessageBox.Warning, '警告', '当前没有图元被选中！')
             msg_box.exec_()
-        elif self.canvas_widget.get_selected_item_type() != 'polygon':
-            msg_box = QMessageBox(QMessageBox.Warning, '警告', '只能填充多边形！')
+        elif self.canvas_widget.get_selected_item_type() not in self.canvas_widget.fillable_types:
+            msg_box = QMessageBox(QMessageBox.Warning, '警告', '只能填充多边形和椭圆！')
             msg_box.exec_()
         else:
             color = QColorDialog.getColor(title="选择填充颜色")
             self.canvas_widget.fill_polygon(color)
 
+    def grid_action(self):
+        '''
+        网格复制GUI窗口
+        '''
+        if self.canvas_widget.get_selected_item_type() is None:
+            msg_box = QMessageBox(QMessageBox.Warning, '警告', '当前没有图元被选中！')
+            msg_box.exec_()
+        else:
+            self.grid_window = GridWidget(self.canvas_widget)
+            self.grid_window.show()
+
     def mouse_selection(self):
         self.canvas_widget.setStatus('mouse')
 
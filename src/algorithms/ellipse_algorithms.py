@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 本文件是椭圆与圆的光栅化算法，轴对齐的椭圆的决策变量全部使用整数运算，只依赖math库和my_algorithms
+import math
+from algorithms import my_algorithms as alg
+
+
+def half(v):
+    '''
+    与int(v / 2)相同的向零取整除法，但只使用整数运算
+    '''
+    return v // 2 if v >= 0 else -(-v // 2)
+
+
+def ellipse_params(p_list):
+    '''
+    由包围框计算椭圆的中心和半轴长，取整方式与my_algorithms.draw_ellipse相同
+    输入：椭圆的矩形包围框的两个对角顶点坐标
+    输出：(xc, yc, a, b)
+    '''
+    x0, y0 = p_list[0]
+    x1, y1 = p_list[1]
+    return half(x0 + x1), half(y0 + y1), half(abs(x1 - x0)), half(abs(y0 - y1))
+
+
+def ellipse_quadrant(a, b):
+    '''
+    中点椭圆算法，依次生成第一象限中的点(x, y)，x单调不减、y单调不增
+    决策变量是my_algorithms.draw_ellipse中浮点决策变量的4倍，符号始终相同，因此生成的点完全一致
+    （包括最后一个y = -1的点）
+    输入：半轴长a, b
+    '''
+    a2 = a * a
+    b2 = b * b
+    x, y = 0, b
+    yield x, y
+
+    p = 4 * b2 + a2 * (1 - 4 * b)
+    while 2 * b2 * (x + 1) < a2 * (2 * y - 1):
+        if p < 0:
+            p += 4 * b2 * (2 * x + 3)
+        else:
+            p += 4 * b2 * (2 * x + 3) + 8 * a2 * (1 - y)
+            y -= 1
+        x += 1
+        yield x, y
+
+    p = b2 * (2 * x + 1) ** 2 + 4 * a2 * (y - 1) ** 2 - 4 * a2 * b2
+    while y >= 0:
+        if p < 0:
+            p += 4 * a2 * (3 - 2 * y) + 8 * b2 * (x + 1)
+            x += 1
+        else:
+            p += 4 * a2 * (3 - 2 * y)
+        y -= 1
+        yield x, y
+
+
+def circle_octant(r):
+    '''
+    中点画圆算法，依次生成x = 0到x = y的八分之一圆弧上的点(x, y)，其余部分由对称性得到
+    输入：半径r
+    '''
+    x, y = 0, r
+    p = 1 - r
+    yield x, y
+    while x < y:
+        x += 1
+        if p < 0:
+            p += 2 * x + 1
+        else:
+            y -= 1
+            p += 2 * (x - y) + 1
+        yield x, y
+
+
+def draw_ellipse(p_list, rect=None, angle=0):
+    """绘制椭圆的轮廓，半轴相等时使用画圆算法（每步得到8个点）
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1]]) 椭圆（旋转前）的矩形包围框的两个对角顶点坐标
+    :param rect: (tuple) 可见区域(x_min, y_min, x_max, y_max)，包含边界；给出时只输出其中的像素，
+        所有象限都离开可见区域后提前结束
+    :param angle: (float) 绕中心顺时针旋转的角度（°），不是180°的整数倍时按隐式二次曲线绘制
+    :return: (list of tuple of int: [(x_0, y_0), (x_1, y_1), ...]) 绘制结果的像素点坐标列表，
+        不旋转且非圆的情况与my_algorithms.draw_ellipse相同
+    """
+    if angle % 180 != 0:
+        center, radii = ellipse_frame(p_list)
+        return draw_rotated_ellipse(center, radii, angle, rect)
+    xc, yc, a, b = ellipse_params(p_list)
+    result = []
+    if rect is not None and (xc + a < rect[0] or xc - a > rect[2] or yc + b < rect[1] - 1 or yc - b > rect[3] + 1):
+        return result
+    if a == b:
+        for x, y in circle_octant(a):
+            # 八分之一圆弧上的点同时按坐标轴和对角线对称
+            if rect is not None and alg.ellipse_passed(xc, yc, x, y, rect) and \
+                    alg.ellipse_passed(xc, yc, y, x, rect):
+                break
+            result += alg.ellipse_point(xc, yc, x, y, rect)
+            result += alg.ellipse_point(xc, yc, y, x, rect)
+        return result
+    for x, y in ellipse_quadrant(a, b):
+        if rect is not None and alg.ellipse_passed(xc, yc, x, y, rect):
+            break
+        result += alg.ellipse_point(xc, yc, x, y, rect)
+    return result
+
+
+def half_widths(a, b):
+    '''
+    椭圆每一行的半宽：第一象限中纵坐标为y的轮廓点的最大横坐标
+    输入：半轴长a, b
+    输出：长度为b + 1的列表，第y项为第y行（相对中心）的半宽
+    '''
+    widths = [0] * (b + 1)
+    if a == b:
+        for x, y in circle_octant(a):
+            # 对角线两侧的点互为对称，同一行中后生成的点x更大
+            widths[y] = max(widths[y], x)
+            widths[x] = max(widths[x], y)
+        return widths
+    for x, y in ellipse_quadrant(a, b):
+        if y >= 0:
+            widths[y] = x
+    return widths
+
+
+def ellipse_spans(p_list, rect=None, angle=0):
+    '''
+    填充椭圆（或圆）内部的水平区间，每行一个区间，覆盖的像素包含轮廓
+    输入：椭圆（旋转前）的矩形包围框的两个对角顶点坐标，可见区域(x_min, y_min, x_max, y_max)（包含边界，为None时不限制），
+        绕中心顺时针旋转的角度（°）
+    输出：按行从上到下排列的区间列表[(y, x0, x1), ...]，包含两个端点；给出可见区域时区间被截取到区域内
+    '''
+    if angle % 180 != 0:
+        center, radii = ellipse_frame(p_list)
+        return rotated_ellipse_spans(center, radii, angle, rect)
+    xc, yc, a, b = ellipse_params(p_list)
+    widths = half_widths(a, b)
+    y_begin, y_end = yc - b, yc + b
+    if rect is not None:
+        y_begin, y_end = max(y_begin, rect[1]), min(y_end, rect[3])
+    result = []
+    for row in range(y_begin, y_end + 1):
+        w = widths[abs(row - yc)]
+        x0, x1 = xc - w, xc + w
+        if rect is not None:
+            x0, x1 = max(x0, rect[0]), min(x1, rect[2])
+            if x0 > x1:
+                continue
+        result.append((row, x0, x1))
+    return result
+
+
+def ellipse_frame(p_list):
+    '''
+    由（旋转前的）包围框计算椭圆精确的中心和半轴长
+    输入：椭圆的矩形包围框的两个对角顶点坐标
+    输出：((cx, cy), (a, b))，均为浮点数
+    '''
+    x0, y0 = p_list[0]
+    x1, y1 = p_list[1]
+    return ((x0 + x1) / 2, (y0 + y1) / 2), (abs(x1 - x0) / 2, abs(y1 - y0) / 2)
+
+
+def rotated_extent(radii, angle):
+    '''
+    旋转后椭圆的包围框的半宽和半高
+    输入：半轴长(a, b)，顺时针旋转的角度（°）
+    '''
+    a, b = radii
+    radian = angle * math.pi / 180.0
+    c, s = math.cos(radian), math.sin(radian)
+    return math.sqrt(a * a * c * c + b * b * s * s), math.sqrt(a * a * s * s + b * b * c * c)
+
+
+def rotated_rows(center, radii, angle, y_begin=None, y_end=None):
+    '''
+    旋转椭圆每一行的内部区间
+    椭圆上的点(x, y)相对中心的偏移记为(dx, dy)，旋转前的局部坐标为u = c*dx + s*dy, v = -s*dx + c*dy，
+    代入u^2 / a^2 + v^2 / b^2 <= 1得到隐式二次曲线 A*dx^2 + B*dx*dy + C*dy^2 <= a^2*b^2，其中
+    A = b^2*c^2 + a^2*s^2, B = 2*c*s*(b^2 - a^2), C = b^2*s^2 + a^2*c^2；
+    固定dy时判别式为4*a^2*b^2*(A - dy^2)，因此每一行的区间可以直接解出，行数与轴对齐的椭圆相同
+    输入：中心(cx, cy)，半轴长(a, b)，顺时针旋转的角度（°），只计算[y_begin, y_end]内的行（为None时不限制）
+    输出：按行从上到下排列的区间列表[(y, x0, x1), ...]，包含两个端点，每行至少一个像素
+    '''
+    cx, cy = center
+    a, b = radii
+    radian = angle * math.pi / 180.0
+    c, s = math.cos(radian), math.sin(radian)
+    A = b * b * c * c + a * a * s * s
+    B = 2 * c * s * (b * b - a * a)
+    # 半高为sqrt(A)；椭圆过扁而没有经过任何整数行时，取离中心最近的一行
+    h = math.sqrt(A)
+    first, last = math.ceil(cy - h), math.floor(cy + h)
+    if first > last:
+        first = last = round(cy)
+    if y_begin is not None:
+        first = max(first, y_begin)
+    if y_end is not None:
+        last = min(last, y_end)
+
+    result = []
+    for y in range(first, last + 1):
+        dy = y - cy
+        if A == 0:  # 退化为一个点
+            result.append((y, round(cx), round(cx)))
+            continue
+        mid = -B * dy / (2 * A)
+        w = a * b * math.sqrt(max(A - dy * dy, 0)) / A
+        x0, x1 = math.ceil(cx + mid - w), math.floor(cx + mid + w)
+        if x0 > x1:  # 区间内没有像素中心时取最近的像素，保证轮廓连续
+            x0 = x1 = round(cx + mid)
+        result.append((y, x0, x1))
+    return result
+
+
+def rotated_ellipse_spans(center, radii, angle, rect=None):
+    '''
+    填充旋转椭圆内部的水平区间，与ellipse_spans的输出格式相同
+    输入：中心(cx, cy)，半轴长(a, b)，顺时针旋转的角度（°），可见区域(x_min, y_min, x_max, y_max)（为None时不限制）
+    '''
+    if rect is None:
+        return rotated_rows(center, radii, angle)
+    result = []
+    for y, x0, x1 in rotated_rows(center, radii, angle, rect[1], rect[3]):
+        x0, x1 = max(x0, rect[0]), min(x1, rect[2])
+        if x0 <= x1:
+            result.append((y, x0, x1))
+    return result
+
+
+def draw_rotated_ellipse(center, radii, angle, rect=None):
+    '''
+    绘制旋转椭圆的轮廓：每一行内部区间的两端，各自延伸到与上下两行中较远的区间端点相接；
+    很扁的椭圆相邻两行的区间可能互不重叠，此时再补上与上一行之间的像素，使轮廓8连通
+    输入：中心(cx, cy)，半轴长(a, b)，顺时针旋转的角度（°），可见区域(x_min, y_min, x_max, y_max)（为None时不限制）
+    输出：按行从上到下排列的像素点坐标列表
+    '''
+    if rect is None:
+        rows = rotated_rows(center, radii, angle)
+    else:
+        # 可见区域边缘的行需要参考区域外的相邻行
+        rows = rotated_rows(center, radii, angle, rect[1] - 1, rect[3] + 1)
+    result = []
+    for i, (y, x0, x1) in enumerate(rows):
+        if rect is not None and not rect[1] <= y <= rect[3]:
+            continue
+        above = rows[i - 1] if i > 0 else None
+        below = rows[i + 1] if i + 1 < len(rows) else None
+        if above is None or below is None:  # 最上和最下一行整行都是轮廓
+            runs = [(x0, x1)]
+        else:
+            left_end = min(x1, max(x0, above[1] - 1, below[1] - 1))
+            right_begin = max(x0, min(x1, above[2] + 1, below[2] + 1))
+            if left_end + 1 >= right_begin:
+                runs = [(x0, x1)]
+            else:
+                runs = [(x0, left_end), (right_begin, x1)]
+        if above is not None:
+            if above[2] < x0 - 1:
+                runs.insert(0, (above[2] + 1, x0 - 1))
+            elif above[1] > x1 + 1:
+                runs.append((x1 + 1, above[1] - 1))
+        for begin, end in runs:
+            if rect is not None:
+                begin, end = max(begin, rect[0]), min(end, rect[2])
+            for x in range(begin, end + 1):
+                result.append((x, y))
+    return result
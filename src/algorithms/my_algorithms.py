@@ -5,23 +5,93 @@
 import math
 
 
-def line_naive(p_list):
+def repeat_add(v, inc, n):
+    '''
+    计算执行n次 v += inc 之后v的值，结果（包括每一步的舍入误差）与逐次累加完全相同
+    同一个二进制数量级内的浮点数都是ulp的整数倍，每次加法的结果都恰好增加round(inc / ulp)个ulp，
+    因此可以一次跳过多步；只有跨越数量级或舍入恰好处于中点时才逐次相加
+    输入：初始值，增量，累加次数
+    '''
+    while n > 0:
+        if v == 0 or inc == 0:
+            v += inc
+            n -= 1
+            if inc == 0:
+                return v
+            continue
+        m, e = math.frexp(v)  # v = m * 2^e，0.5 <= |m| < 1
+        ulp = math.ldexp(1.0, e - 53)
+        q = inc / ulp
+        if abs(q) >= 2 ** 52 or q - math.floor(q) == 0.5:
+            v += inc
+            n -= 1
+            continue
+        q = round(q)
+        if q == 0:  # 增量小于半个ulp，之后的加法不再改变v
+            return v
+        big_v = int(math.ldexp(m, 53))  # v / ulp
+        # 结果与数量级边界之间至少留出1个ulp，保证每一步的舍入都发生在同一个数量级内
+        if big_v > 0:
+            low, high = 2 ** 52 + 1, 2 ** 53 - 1
+        else:
+            low, high = -(2 ** 53 - 1), -(2 ** 52 + 1)
+        k = (high - big_v) // q if q > 0 else (big_v - low) // -q
+        k = min(k, n)
+        if k <= 0:
+            v += inc
+            n -= 1
+            continue
+        v = math.ldexp(big_v + k * q, e - 53)
+        n -= k
+    return v
+
+
+def in_rect(rect, x, y):
+    '''
+    判断像素是否位于可见区域内
+    输入：可见区域(x_min, y_min, x_max, y_max)（包含边界，为None时不限制），像素坐标
+    '''
+    return rect is None or (rect[0] <= x <= rect[2] and rect[1] <= y <= rect[3])
+
+
+def visible_steps(start, direction, count, low, high):
+    '''
+    沿某个方向每步前进1时，坐标落在[low, high]内的步数范围
+    输入：起始坐标，方向（1或-1），总步数，可见范围
+    输出：(第一步, 最后一步)，第一步大于最后一步时表示不可见
+    '''
+    if direction > 0:
+        return max(0, low - start), min(count, high - start)
+    return max(0, start - high), min(count, start - low)
+
+
+def line_naive(p_list, rect=None):
     x0, y0 = p_list[0]
     x1, y1 = p_list[1]
     result = []
     if x0 == x1:
-        for y in range(y0, y1 + 1):
+        y_b, y_e = y0, y1
+        if rect is not None:
+            if not rect[0] <= x0 <= rect[2]:
+                return result
+            y_b, y_e = max(y_b, rect[1]), min(y_e, rect[3])
+        for y in range(y_b, y_e + 1):
             result.append((x0, y))
     else:
         if x0 > x1:
             x0, y0, x1, y1 = x1, y1, x0, y0
         k = (y1 - y0) / (x1 - x0)
-        for x in range(x0, x1 + 1):
-            result.append((x, int(y0 + k * (x - x0))))
+        x_b, x_e = x0, x1
+        if rect is not None:
+            x_b, x_e = max(x_b, rect[0]), min(x_e, rect[2])
+        for x in range(x_b, x_e + 1):
+            y = int(y0 + k * (x - x0))
+            if rect is None or rect[1] <= y <= rect[3]:
+                result.append((x, y))
     return result
 
 
-def line_dda(p_list):
+def line_dda(p_list, rect=None):
     x0, y0 = p_list[0]
     x1, y1 = p_list[1]
     result = []
@@ -31,21 +101,67 @@ def line_dda(p_list):
     absDy = abs(dy)
     step = max(absDx, absDy)  # 选择较大的一者作为遍历的跨度
     if step == 0:
-        result.append((x0, y0))
+        if in_rect(rect, x0, y0):
+            result.append((x0, y0))
     else:
         xInc = dx / step
         yInc = dy / step
-        x = x0
-        y = y0
-        result.append((x, y))
-        for i in range(0, int(step)):
+        i_b, i_e = 0, int(step)
+        if rect is not None:
+            # 主方向上每步恰好前进1，据此直接算出可见的步数范围
+            if absDx >= absDy:
+                i_b, i_e = visible_steps(x0, xInc, i_e, rect[0], rect[2])
+            else:
+                i_b, i_e = visible_steps(y0, yInc, i_e, rect[1], rect[3])
+        # 跳过不可见的部分（停在第一个可见点之前），累加的舍入误差与逐步累加相同
+        i_s = max(i_b, 1) - 1
+        x = repeat_add(x0, xInc, i_s)
+        y = repeat_add(y0, yInc, i_s)
+        if i_b == 0 and in_rect(rect, x, y):
+            result.append((x, y))
+        for i in range(i_s + 1, i_e + 1):
             x += xInc
             y += yInc
-            result.append((int(x), int(y)))
+            if in_rect(rect, int(x), int(y)):
+                result.append((int(x), int(y)))
     return result
 
 
-def line_Bresenham(p_list):
+def bresenham_state(k, major, minor, p0):
+    '''
+    Bresenham算法沿主方向前进k步之后的状态：决策变量每步增加2*minor，非负时在次方向上前进一步并减去2*major，
+    因此前进的次数为floor((2*minor*k + major) / (2*major))
+    输入：步数，主方向和次方向的跨度（major > 0），决策变量初始值
+    输出：(次方向前进的次数, 决策变量)
+    '''
+    minor_steps = (2 * minor * k + major) // (2 * major)
+    return minor_steps, p0 + 2 * minor * k - 2 * major * minor_steps
+
+
+def bresenham_visible_steps(major, minor, start, direction, low, high):
+    '''
+    Bresenham算法中次方向坐标落在[low, high]内的步数范围
+    输入：主方向和次方向的跨度（major > 0），次方向起始坐标，次方向前进的方向，可见范围
+    输出：(第一步, 最后一步)，可能超出线段本身的范围
+    '''
+    # 次方向需要前进的次数范围
+    if direction > 0:
+        m_low, m_high = low - start, high - start
+    else:
+        m_low, m_high = start - high, start - low
+    if minor == 0:
+        # 次方向不移动
+        return (0, major) if m_low <= 0 <= m_high else (1, 0)
+    m_low = max(m_low, 0)
+    if m_low > m_high:
+        return 1, 0
+    # 前进次数不小于m的最小步数、不大于m的最大步数
+    k_b = -((major - 2 * major * m_low) // (2 * minor))
+    k_e = (2 * major * (m_high + 1) - major - 1) // (2 * minor)
+    return k_b, k_e
+
+
+def line_Bresenham(p_list, rect=None):
     x0, y0 = p_list[0]
     x1, y1 = p_list[1]
     result = []
@@ -67,6 +183,9 @@ def line_Bresenham(p_list):
     const_2dy = 2 * absDy
     const_2dx = 2 * absDx
 
+    # 如果当前斜率为正
+    minor_dir = 1 if (dx < 0 and dy < 0) or (dx > 0 and dy > 0) else -1
+
     # 斜率绝对值小于等于1
     if absDy <= absDx:
         if dx >= 0:
@@ -78,19 +197,28 @@ def line_Bresenham(p_list):
             x = x1
             y = y1
             x_e = x0
-        result.append((x, y))
         x_b = x
+        k_b, k_e = 0, x_e - x_b
+        if rect is not None:
+            if absDx == 0:
+                return [(x, y)] if in_rect(rect, x, y) else []
+            # 由主方向和次方向的可见范围确定需要遍历的步数，再用闭式直接得到该处的y和决策变量
+            k_b, k_e = visible_steps(x_b, 1, k_e, rect[0], rect[2])
+            m_b, m_e = bresenham_visible_steps(absDx, absDy, y, minor_dir, rect[1], rect[3])
+            k_b, k_e = max(k_b, m_b), min(k_e, m_e)
+            if k_b > k_e:
+                return result
+            minor_steps, px = bresenham_state(max(k_b, 1) - 1, absDx, absDy, px)
+            y += minor_dir * minor_steps
+        if k_b == 0:
+            result.append((x, y))
         # 遍历x区间
-        for x in range(x_b + 1, x_e + 1):
+        for x in range(x_b + max(k_b, 1), x_b + k_e + 1):
             if px < 0:
                 px += const_2dy
             else:
                 px += const_2dy_m_2dx
-                # 如果当前斜率为正
-                if (dx < 0 and dy < 0) or (dx > 0 and dy > 0):
-                    y += 1
-                else:
-                    y -= 1
+                y += minor_dir
             result.append((x, y))
     # 斜率绝对值大于1
     else:
@@ -102,45 +230,54 @@ def line_Bresenham(p_list):
             x = x1
             y = y1
             y_e = y0
-        result.append((x, y))
         y_b = y
+        k_b, k_e = 0, y_e - y_b
+        if rect is not None:
+            k_b, k_e = visible_steps(y_b, 1, k_e, rect[1], rect[3])
+            m_b, m_e = bresenham_visible_steps(absDy, absDx, x, minor_dir, rect[0], rect[2])
+            k_b, k_e = max(k_b, m_b), min(k_e, m_e)
+            if k_b > k_e:
+                return result
+            minor_steps, py = bresenham_state(max(k_b, 1) - 1, absDy, absDx, py)
+            x += minor_dir * minor_steps
+        if k_b == 0:
+            result.append((x, y))
         # 遍历y区间
-        for y in range(y_b + 1, y_e + 1):
+        for y in range(y_b + max(k_b, 1), y_b + k_e + 1):
             if py < 0:
                 py += const_2dx
             else:
                 py += const_2dx_m_2dy
-                # 如果当前斜率为正
-                if (dx < 0 and dy < 0) or (dx > 0 and dy > 0):
-                    x += 1
-                else:
-                    x -= 1
+                x += minor_dir
             result.append((x, y))
     return result
 
 
-def draw_line(p_list, algorithm):
+def draw_line(p_list, algorithm, rect=None):
     """绘制线段
 
     :param p_list: (list of list of int: [[x0, y0], [x1, y1]]) 线段的起点和终点坐标
     :param algorithm: (string) 绘制使用的算法，包括'DDA'和'Bresenham'，此处的'Naive'仅作为示例，测试时不会出现
+    :param rect: (tuple) 可见区域(x_min, y_min, x_max, y_max)，包含边界；给出时直接跳到线段的可见部分，
+        结果与不给出时位于该区域内的像素（按原顺序）完全相同
     :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 绘制结果的像素点坐标列表
     """
 
     if algorithm == 'Naive':
-        return line_naive(p_list)
+        return line_naive(p_list, rect)
     elif algorithm == 'DDA':
-        return line_dda(p_list)
+        return line_dda(p_list, rect)
     elif algorithm == 'Bresenham':
-        return line_Bresenham(p_list)
+        return line_Bresenham(p_list, rect)
     return None
 
 
-def draw_polygon(p_list, algorithm, finish=True):
+def draw_polygon(p_list, algorithm, finish=True, rect=None):
     """绘制多边形
 
     :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 多边形的顶点坐标列表
     :param algorithm: (string) 绘制使用的算法，包括'DDA'和'Bresenham'
+    :param rect: (tuple) 可见区域(x_min, y_min, x_max, y_max)，含义同draw_line
     :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 绘制结果的像素点坐标列表
     """
     result = []
@@ -150,20 +287,39 @@ def draw_polygon(p_list, algorithm, finish=True):
     else:
         start = 1
     for i in range(start, len(p_list)):
-        line = draw_line([p_list[i - 1], p_list[i]], algorithm)
+        line = draw_line([p_list[i - 1], p_list[i]], algorithm, rect)
         result += line
     return result
 
 
-def ellipse_point(xc, yc, x, y):
+def ellipse_point(xc, yc, x, y, rect=None):
     result = [(xc + x, yc + y), (xc + x, yc - y), (xc - x, yc + y), (xc - x, yc - y)]
+    if rect is not None:
+        result = [point for point in result if in_rect(rect, point[0], point[1])]
     return result
 
 
-def draw_ellipse(p_list):
+def ellipse_passed(xc, yc, x, y, rect):
+    '''
+    中点椭圆算法中x单调不减、y单调不增，判断四个象限中的点此后是否都不会再进入可见区域
+    输入：椭圆中心，当前的x和y（均非负），可见区域
+    '''
+    x_min, y_min, x_max, y_max = rect
+    # 每个象限的点只要所在的列或行已经永远离开可见区域，就不会再可见
+    right_gone = xc + x > x_max
+    left_gone = xc - x < x_min
+    bottom_gone = yc + y < y_min
+    top_gone = yc - y > y_max
+    return (right_gone or bottom_gone) and (right_gone or top_gone) and \
+           (left_gone or bottom_gone) and (left_gone or top_gone)
+
+
+def draw_ellipse(p_list, rect=None):
     """绘制椭圆（采用中点圆生成算法）
 
     :param p_list: (list of list of int: [[x0, y0], [x1, y1]]) 椭圆的矩形包围框左上角和右下角顶点坐标
+    :param rect: (tuple) 可见区域(x_min, y_min, x_max, y_max)，包含边界；给出时只输出其中的像素（顺序不变），
+        决策变量照常迭代但不生成不可见的点，所有象限都离开可见区域后提前结束
     :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 绘制结果的像素点坐标列表
     """
     # 计算出需要a,b及其平方（计算时需要），并计算出椭圆的中心点
@@ -177,7 +333,11 @@ def draw_ellipse(p_list):
     yc = int((y0 + y1) / 2)
     x, y = 0, b
     result = []
-    result += ellipse_point(xc, yc, x, y)
+    if rect is not None:
+        # 包围框（最后一行可能到达y=-1处）与可见区域不相交
+        if xc + a < rect[0] or xc - a > rect[2] or yc + b < rect[1] - 1 or yc - b > rect[3] + 1:
+            return result
+    result += ellipse_point(xc, yc, x, y, rect)
 
     p = b2 + a2 * (-b + 1 / 4)  # 决策变量
 
@@ -188,7 +348,9 @@ def draw_ellipse(p_list):
             p += b2 * (2 * x + 3) + a2 * (-2 * y + 2)
             y -= 1
         x += 1
-        result += ellipse_point(xc, yc, x, y)
+        if rect is not None and ellipse_passed(xc, yc, x, y, rect):
+            return result
+        result += ellipse_point(xc, yc, x, y, rect)
 
     p = b2 * (x + 0.5) ** 2 + a2 * (y - 1) ** 2 - a2 * b2
     while y >= 0:
@@ -198,7 +360,9 @@ def draw_ellipse(p_list):
         else:
             p += a2 * (-2 * y + 3)
         y -= 1
-        result += ellipse_point(xc, yc, x, y)
+        if rect is not None and ellipse_passed(xc, yc, x, y, rect):
+            return result
+        result += ellipse_point(xc, yc, x, y, rect)
     return result
 
 
@@ -241,6 +405,158 @@ def get_bezier_by_math(p_list, t):
     return bezier_x, bezier_y
 
 
+def split_bezier(p_list, t=0.5):
+    '''
+    使用de Casteljau算法在t处将bezier曲线分割为两段
+    输入：控制点坐标，分割位置
+    输出：前后两段曲线各自的控制点
+    '''
+    left = [p_list[0]]
+    right = [p_list[-1]]
+    points = p_list
+    while len(points) > 1:
+        points = [((1 - t) * x0 + t * x1, (1 - t) * y0 + t * y1)
+                  for (x0, y0), (x1, y1) in zip(points[:-1], points[1:])]
+        left.append(points[0])
+        right.append(points[-1])
+    right.reverse()
+    return left, right
+
+
+def bezier_flatness(p_list):
+    '''
+    计算bezier曲线的平坦度：中间控制点到首末控制点连线段的最大距离
+    由于曲线位于控制点的凸包内，曲线与弦之间的偏差不会超过该值
+    '''
+    x0, y0 = p_list[0]
+    x1, y1 = p_list[-1]
+    dx = x1 - x0
+    dy = y1 - y0
+    length2 = dx * dx + dy * dy
+    max_dis2 = 0
+    for x, y in p_list[1:-1]:
+        if length2 == 0:
+            u = 0
+        else:
+            u = min(1, max(0, ((x - x0) * dx + (y - y0) * dy) / length2))
+        ex = x0 + u * dx - x
+        ey = y0 + u * dy - y
+        max_dis2 = max(max_dis2, ex * ex + ey * ey)
+    return math.sqrt(max_dis2)
+
+
+def flatten_bezier(p_list, tolerance=0.5, max_depth=16):
+    '''
+    自适应地将bezier曲线展平为折线：不断对半分割，直到每一段的平坦度满足容差
+    输入：控制点坐标，容差（像素），最大分割深度
+    输出：折线顶点的浮点坐标，首末点即曲线的首末控制点
+    '''
+    first = (p_list[0][0], p_list[0][1])
+    result = [first]
+    stack = [([(x, y) for x, y in p_list], 0)]
+    while len(stack) > 0:
+        points, depth = stack.pop()
+        if depth >= max_depth or bezier_flatness(points) <= tolerance:
+            result.append(points[-1])
+        else:
+            left, right = split_bezier(points)
+            stack.append((right, depth + 1))
+            stack.append((left, depth + 1))
+    return result
+
+
+def draw_bezier_adaptive(p_list, tolerance=0.5, rect=None):
+    '''
+    自适应绘制bezier曲线：展平为折线后用Bresenham算法连接，结果连续且不含重复像素
+    输入：控制点坐标，展平容差（像素），可见区域（为None时不限制）
+    '''
+    vertices = [(int(x), int(y)) for x, y in flatten_bezier(p_list, tolerance)]
+    result = [vertices[0]] if in_rect(rect, vertices[0][0], vertices[0][1]) else []
+    for i in range(1, len(vertices)):
+        if vertices[i] != vertices[i - 1]:
+            result += line_Bresenham([vertices[i - 1], vertices[i]], rect)
+    # 相邻线段共享端点，去重时保持像素顺序
+    return list(dict.fromkeys(result))
+
+
+def piecewise_bezier_segment(p_list, i):
+    '''
+    分段三次bezier曲线第i段（从第i个点到第i+1个点）的4个控制点
+    曲线经过所有输入点，每个点处的切线取前后两点的连线方向（Catmull-Rom），因此相邻两段在连接点处C1连续
+    输入：点坐标列表（至少2个），段号
+    '''
+    n = len(p_list)
+    p_prev, p0 = p_list[max(i - 1, 0)], p_list[i]
+    p3, p_next = p_list[i + 1], p_list[min(i + 2, n - 1)]
+    p1 = [p0[0] + (p3[0] - p_prev[0]) / 6.0, p0[1] + (p3[1] - p_prev[1]) / 6.0]
+    p2 = [p3[0] - (p_next[0] - p0[0]) / 6.0, p3[1] - (p_next[1] - p0[1]) / 6.0]
+    return [p0, p1, p2, p3]
+
+
+def piecewise_bezier_step_num(segment):
+    '''
+    一段三次bezier曲线的采样个数：曲线的速度不超过控制多边形最长边的3倍，因此相邻采样点的距离不超过1个像素
+    输入：4个控制点
+    '''
+    longest = 0.0
+    for k in range(3):
+        dx = segment[k + 1][0] - segment[k][0]
+        dy = segment[k + 1][1] - segment[k][1]
+        longest = max(longest, math.sqrt(dx * dx + dy * dy))
+    return int(3 * longest) + 1
+
+
+def draw_piecewise_bezier_segment(segment):
+    '''
+    按参数t均匀采样绘制一段三次bezier曲线，不含t=1处的终点（即下一段的起点），并去掉连续重复的像素
+    输入：4个控制点
+    '''
+    result = []
+    step_num = piecewise_bezier_step_num(segment)
+    step = 1.0 / step_num
+    t = 0.0
+    (x0, y0), (x1, y1), (x2, y2), (x3, y3) = segment
+    for i in range(step_num):
+        mt = 1 - t
+        b0 = mt * mt * mt
+        b1 = 3 * mt * mt * t
+        b2 = 3 * mt * t * t
+        b3 = t * t * t
+        pixel = (int(b0 * x0 + b1 * x1 + b2 * x2 + b3 * x3), int(b0 * y0 + b1 * y1 + b2 * y2 + b3 * y3))
+        if not result or pixel != result[-1]:  # 相邻采样点常落在同一像素上
+            result.append(pixel)
+        t += step
+    return result
+
+
+def hull_outside(p_list, rect):
+    '''
+    判断控制点的包围框是否与可见区域不相交：曲线位于控制点的凸包内，且取整是单调的，此时曲线上的像素都不可见
+    输入：控制点坐标，可见区域
+    '''
+    xs = [p[0] for p in p_list]
+    ys = [p[1] for p in p_list]
+    return int(max(xs)) < rect[0] or int(min(xs)) > rect[2] or int(max(ys)) < rect[1] or int(min(ys)) > rect[3]
+
+
+def draw_piecewise_bezier(p_list, rect=None):
+    '''
+    绘制分段三次bezier曲线，每段只与相邻的4个点有关，可以独立计算
+    输入：点坐标列表，可见区域（为None时不限制，否则跳过完全不可见的段）
+    '''
+    result = []
+    for i in range(len(p_list) - 1):
+        segment = piecewise_bezier_segment(p_list, i)
+        if rect is None:
+            result += draw_piecewise_bezier_segment(segment)
+        elif not hull_outside(segment, rect):
+            result += [point for point in draw_piecewise_bezier_segment(segment) if in_rect(rect, point[0], point[1])]
+    last = (int(p_list[-1][0]), int(p_list[-1][1]))
+    if in_rect(rect, last[0], last[1]):
+        result.append(last)
+    return result
+
+
 def get_B_spline(p_list):
     '''
     获取b样条曲线
@@ -293,39 +609,84 @@ def get_B_spline(p_list):
     return ret
 
 
-def draw_curve(p_list, algorithm):
+def draw_curve(p_list, algorithm, tolerance=None, rect=None):
     """绘制曲线
 
     :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 曲线的控制点坐标列表
-    :param algorithm: (string) 绘制使用的算法，包括'Bezier'和'B-spline'（三次均匀B样条曲线，曲线不必经过首末控制点）
+    :param algorithm: (string) 绘制使用的算法，包括'Bezier'、'B-spline'（三次均匀B样条曲线，曲线不必经过首末控制点）
+        和'Bezier-piecewise'（经过所有控制点、C1连续的分段三次Bezier曲线）
+    :param tolerance: (float) Bezier曲线自适应展平的容差（像素），为None时按固定的1000个参数步长采样
+    :param rect: (tuple) 可见区域(x_min, y_min, x_max, y_max)，包含边界；给出时只输出其中的像素（顺序不变）
     :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 绘制结果的像素点坐标列表
     """
     result = []
     step_num = 1000
-    if algorithm == 'Bezier':
+    if rect is not None and algorithm != 'Bezier-piecewise' and len(p_list) > 0 and hull_outside(p_list, rect):
+        return result
+    if algorithm == 'Bezier' and tolerance is not None:
+        result += draw_bezier_adaptive(p_list, tolerance, rect)
+    elif algorithm == 'Bezier':
         step = 1.0 / step_num
         t = 0.0
         pLen = len(p_list)
         for i in range(step_num):
             # x,y=get_bezier(p_list,pLen-1,0,t)
             x, y = get_bezier_by_math(p_list, t)
-            result += [(int(x), int(y))]
+            if in_rect(rect, int(x), int(y)):
+                result += [(int(x), int(y))]
             t += step
     elif algorithm == 'B-spline':
-        result += get_B_spline(p_list)
+        result += [point for point in get_B_spline(p_list) if in_rect(rect, point[0], point[1])]
+    elif algorithm == 'Bezier-piecewise':
+        result += draw_piecewise_bezier(p_list, rect)
     return result
 
 
-def draw_control_points(p_list, algorithm):
+def b_spline_segment(p_list, i):
+    '''
+    三次均匀B样条第i段（由第i到i+3个控制点决定）等价的三次bezier曲线的4个控制点
+    输入：控制点坐标列表（至少4个），段号
+    '''
+    (x0, y0), (x1, y1), (x2, y2), (x3, y3) = p_list[i:i + 4]
+    return [((x0 + 4 * x1 + x2) / 6.0, (y0 + 4 * y1 + y2) / 6.0),
+            ((2 * x1 + x2) / 3.0, (2 * y1 + y2) / 3.0),
+            ((x1 + 2 * x2) / 3.0, (y1 + 2 * y2) / 3.0),
+            ((x1 + 4 * x2 + x3) / 6.0, (y1 + 4 * y2 + y3) / 6.0)]
+
+
+def flatten_curve(p_list, algorithm, tolerance=0.5):
+    '''
+    将曲线展平为折线：各种曲线都先转换为若干段bezier曲线，再逐段自适应展平
+    输入：控制点坐标列表，绘制算法（与draw_curve相同），展平容差（像素）
+    输出：折线顶点的浮点坐标
+    '''
+    if algorithm == 'B-spline':
+        segments = [b_spline_segment(p_list, i) for i in range(len(p_list) - 3)]
+    elif algorithm == 'Bezier-piecewise':
+        segments = [piecewise_bezier_segment(p_list, i) for i in range(len(p_list) - 1)]
+    else:
+        segments = [p_list] if len(p_list) > 1 else []
+    if len(segments) == 0:
+        return [(p[0], p[1]) for p in p_list[:1]]
+
+    result = []
+    for segment in segments:
+        points = flatten_bezier(segment, tolerance)
+        result += points if len(result) == 0 else points[1:]  # 相邻两段首尾相接
+    return result
+
+
+def draw_control_points(p_list, algorithm, rect=None):
     """绘制曲线的控制点
 
     :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 曲线的控制点坐标
     :param algorithm: (string) 绘制使用的算法，包括'DDA'和'Bresenham'
+    :param rect: (tuple) 可见区域(x_min, y_min, x_max, y_max)，含义同draw_line
     :return: (list of list of int: [[x_0, y_0], [x_1, y_1], [x_2, y_2], ...]) 绘制结果的像素点坐标列表
     """
     result = []
     for i in range(1, len(p_list)):  # 不需要首尾相连
-        line = draw_line([p_list[i - 1], p_list[i]], algorithm)
+        line = draw_line([p_list[i - 1], p_list[i]], algorithm, rect)
         result += line
     return result
 
@@ -388,6 +749,68 @@ def scale(p_list, x, y, s):
     return translate(p_list, x, y)
 
 
+def identity_matrix():
+    '''
+    3x3单位矩阵，齐次坐标下的仿射变换矩阵均以[[a, b, c], [d, e, f], [0, 0, 1]]的形式表示
+    '''
+    return [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+
+
+def translate_matrix(dx, dy):
+    '''
+    平移变换的矩阵，输入与translate相同
+    '''
+    return [[1.0, 0.0, dx], [0.0, 1.0, dy], [0.0, 0.0, 1.0]]
+
+
+def integer_translation(m):
+    '''
+    判断变换矩阵是否为整数平移
+    输入：变换矩阵
+    输出：平移量(dx, dy)，不是整数平移时返回None
+    '''
+    if m[0][0] == 1 and m[1][1] == 1 and m[0][1] == 0 and m[1][0] == 0 and \
+            float(m[0][2]).is_integer() and float(m[1][2]).is_integer():
+        return int(m[0][2]), int(m[1][2])
+    return None
+
+
+def rotate_matrix(x, y, r):
+    '''
+    绕(x, y)顺时针旋转r度的矩阵，输入与rotate相同
+    '''
+    radian = r * math.pi / 180.0
+    cos_val = math.cos(radian)
+    sin_val = math.sin(radian)
+    return [[cos_val, -sin_val, x - cos_val * x + sin_val * y],
+            [sin_val, cos_val, y - sin_val * x - cos_val * y],
+            [0.0, 0.0, 1.0]]
+
+
+def scale_matrix(x, y, s):
+    '''
+    以(x, y)为中心缩放s倍的矩阵，输入与scale相同
+    '''
+    return [[s, 0.0, x - s * x], [0.0, s, y - s * y], [0.0, 0.0, 1.0]]
+
+
+def multiply_matrix(m1, m2):
+    '''
+    矩阵乘法m1 * m2，即先做m2变换再做m1变换
+    '''
+    return [[sum(m1[i][k] * m2[k][j] for k in range(3)) for j in range(3)] for i in range(3)]
+
+
+def apply_matrix(m, p_list):
+    '''
+    对一组点做仿射变换，不取整
+    输入：变换矩阵，点坐标列表
+    输出：变换后的浮点坐标列表[[x0, y0], [x1, y1], ...]
+    '''
+    (a, b, c), (d, e, f) = m[0], m[1]
+    return [[a * x + b * y + c, d * x + e * y + f] for x, y in p_list]
+
+
 def encode(x_min, y_min, x_max, y_max, x, y):
     """
     使用比较法进行端点编码
@@ -533,231 +956,186 @@ def clip(p_list, x_min, y_min, x_max, y_max, algorithm):
         return clip_liang_barsky(p_list, x_min, y_min, x_max, y_max)
 
 
-class Node:
-    def __init__(self, data, next=None):
-        self.data = data
-        self.next = next
-
-
-class LinkList:
-    def __init__(self):
-        self.head = None
-
-    def is_empty(self):
-        return self.head is None
-
-    def append(self, data):
-        # 在链表的尾部添加一个节点
-        new_node = Node(data)
-        if self.head is None:
-            self.head = new_node
-            return
-
-        cur_node = self.head
-        while cur_node.next is not None:
-            cur_node = cur_node.next
-        cur_node.next = new_node
-
-    def remove(self, val):
-        pre_node = None
-        cur_node = self.head
-        while cur_node is not None and cur_node.data != val:
-            pre_node = cur_node
-            cur_node = cur_node.next
-        if cur_node is not None:
-            if pre_node is None:
-                self.head = cur_node.next
-            else:
-                pre_node.next = cur_node.next
-        else:
-            pass
+def clip_polygon_sutherland_hodgman(p_list, x_min, y_min, x_max, y_max):
+    '''
+    使用Sutherland-Hodgman算法将多边形裁剪到矩形窗口内：依次用窗口的四条边界裁剪，每次保留位于内侧的部分
+    :param p_list: 多边形顶点坐标
+    :param x_min: 裁剪窗口左上角x坐标
+    :param y_min: 裁剪窗口左上角y坐标
+    :param x_max: 裁剪窗口右下角x坐标
+    :param y_max: 裁剪窗口右下角y坐标
+    :return: 裁剪之后的多边形顶点（可能为浮点坐标），多边形位于窗口之外时返回空列表
+    '''
+    if x_min > x_max:
+        x_min, x_max = x_max, x_min
+    if y_min > y_max:
+        y_min, y_max = y_max, y_min
 
-    def print(self):
-        cur_node = self.head
-        node_list = []
-        while cur_node is not None:
-            node_list.append(cur_node)
-            cur_node = cur_node.next
-        for node in node_list:
-            print(node.data)
+    # (坐标轴, 边界值, 方向)：方向为1时保留坐标不小于边界值的一侧，为-1时保留不大于边界值的一侧
+    boundaries = [(0, x_min, 1), (0, x_max, -1), (1, y_min, 1), (1, y_max, -1)]
+    result = [(p[0], p[1]) for p in p_list]
+    for axis, bound, sign in boundaries:
+        points = result
+        result = []
+        for i in range(len(points)):
+            prev, cur = points[i - 1], points[i]
+            prev_in = (prev[axis] - bound) * sign >= 0
+            cur_in = (cur[axis] - bound) * sign >= 0
+            if prev_in != cur_in:  # 边与边界相交，加入交点
+                u = (bound - prev[axis]) / (cur[axis] - prev[axis])
+                inter = [prev[0] + u * (cur[0] - prev[0]), prev[1] + u * (cur[1] - prev[1])]
+                inter[axis] = bound
+                result.append((inter[0], inter[1]))
+            if cur_in:
+                result.append(cur)
+    return result
 
 
-def polygon_fill(p_list, height):
-    draw_points = []
-    y_min = 999999999
-    y_max = -1
-    for edge in p_list:
-        if edge[1] < y_min:
-            y_min = edge[1]
-        if edge[1] > y_max:
-            y_max = edge[1]
-
-    # y_min = max(0, y_min)
-    y_max = min(height-1, y_max)
-    polygon_len = len(p_list)
+def clip_polyline(p_list, x_min, y_min, x_max, y_max):
+    '''
+    使用Liang-Barsky算法逐段裁剪折线，连续的、位于窗口内的部分合并为一条折线
+    :param p_list: 折线顶点坐标
+    :param x_min: 裁剪窗口左上角x坐标
+    :param y_min: 裁剪窗口左上角y坐标
+    :param x_max: 裁剪窗口右下角x坐标
+    :param y_max: 裁剪窗口右下角y坐标
+    :return: 裁剪之后的若干条折线（可能为浮点坐标）
+    '''
+    if x_min > x_max:
+        x_min, x_max = x_max, x_min
+    if y_min > y_max:
+        y_min, y_max = y_max, y_min
 
-    def get_valid_index(index):
-        return (index + polygon_len)%polygon_len
-    NET = []
-    for i in range(height):
-        NET.append(None)
-
-    def NET_add(index, item):
-        if NET[index] is None:
-            NET[index] = LinkList()
-        NET[index].append(item)
-
-    for y_index in range(y_min, y_max + 1):
-        for p_index, edge in enumerate(p_list):
-            if edge[1] == y_index:
-                # 尝试将该点附近的两条边加入边表中
-                [cur_x, cur_y] = edge
-                if p_list[get_valid_index(p_index-1)][1] > cur_y:
-                    [tem_x, tem_y] = p_list[get_valid_index(p_index-1)]
-                    m = (cur_x - tem_x) / (cur_y - tem_y)
-                    NET_add(y_index, [cur_x, m, tem_y])
-
-                if p_list[get_valid_index(p_index+1)][1] > cur_y:
-                    [tem_x, tem_y] = p_list[get_valid_index(p_index+1)]
-                    m = (tem_x - cur_x) / (tem_y - cur_y)
-                    NET_add(y_index, [cur_x, m, tem_y])
-
-    def float_equal(x, y, threshold = 1e-3):
-        return (x-y)<threshold
-
-    AET = LinkList()
-    for y_index in range(y_min, y_max+1):
-        # 从边表中加边
-        if NET[y_index] is not None:
-            cur_node = NET[y_index].head
-            while cur_node is not None:
-                AET.append(cur_node.data)
-                cur_node = cur_node.next
+    pieces = []
+    current = None  # 当前正在延伸的折线
+    for i in range(1, len(p_list)):
+        x_0, y_0 = p_list[i - 1]
+        x_1, y_1 = p_list[i]
+        delta_x = x_1 - x_0
+        delta_y = y_1 - y_0
+        p_q = [
+            [-delta_x, x_0 - x_min],
+            [delta_x, x_max - x_0],
+            [-delta_y, y_0 - y_min],
+            [delta_y, y_max - y_0]
+        ]
+        u_begin = 0
+        u_end = 1
+        for p, q in p_q:
+            if p == 0:
+                if q < 0:
+                    u_begin, u_end = 1, 0
+                    break
+                continue
+            if p < 0:
+                u_begin = max(u_begin, q / p)
+            else:
+                u_end = min(u_end, q / p)
 
-        # 删除边
-        if not AET.is_empty():
-            cur_node = AET.head
-            while cur_node is not None:
-                [pre_x, m, y_top] = cur_node.data
-                if y_top == y_index:
-                    cur_node = cur_node.next
-                    AET.remove([pre_x, m, y_top])
-                    continue
-                cur_node = cur_node.next
+        if u_begin > u_end:  # 这一段位于窗口之外
+            current = None
+            continue
+        if current is None or u_begin > 0:
+            current = [(x_0 + u_begin * delta_x, y_0 + u_begin * delta_y)]
+            pieces.append(current)
+        current.append((x_0 + u_end * delta_x, y_0 + u_end * delta_y))
+        if u_end < 1:
+            current = None
+    return pieces
 
-        # 扫描填充
-        x_list = []
-        if not AET.is_empty():
-            cur_node = AET.head
-            while cur_node is not None:
-                [pre_x, m, y_top] = cur_node.data
-                cur_node = cur_node.next
-                x_list.append(pre_x)
-
-            x_list.sort()
-
-            for x_index in range(0, len(x_list), 2):
-                x_1 = x_list[x_index]
-                x_2 = x_list[x_index+1]
-                for tem_x in range(int(x_1), int(x_2+1) ):
-                    draw_points.append([int(tem_x), int(y_index)])
 
-        # 更新边
-        if not AET.is_empty():
-            cur_node = AET.head
-            while cur_node is not None:
-                [pre_x, m, y_top] = cur_node.data
-                pre_x += m
-                cur_node.data = [pre_x, m, y_top]
-                cur_node = cur_node.next
-    return draw_points
+def round_points(p_list):
+    '''
+    将裁剪得到的浮点坐标取整作为新的图元参数，并去掉连续重复的点
+    '''
+    result = []
+    for x, y in p_list:
+        point = [round(x), round(y)]
+        if len(result) == 0 or point != result[-1]:
+            result.append(point)
+    return result
 
 
-def polygon_fill_line(p_list, height):
-    draw_points = []
-    y_min = 999999999
-    y_max = -1
-    for edge in p_list:
-        if edge[1] < y_min:
-            y_min = edge[1]
-        if edge[1] > y_max:
-            y_max = edge[1]
-
-    # y_min = max(0, y_min)
-    y_max = min(height-1, y_max)
+def polygon_scanlines(p_list, height, rect=None):
+    '''
+    多边形扫描线算法（新边表 + 活动边表），逐行给出扫描线与多边形各边交点的x坐标
+    输入：多边形顶点坐标，画布高度，可见区域(x_min, y_min, x_max, y_max)（为None时不限制）
+    输出：依次生成(y, 排好序的交点x坐标列表)，只包含可见区域内的扫描线
+    '''
+    if len(p_list) == 0:
+        return
+    y_min = min(p[1] for p in p_list)
+    y_max = min(height - 1, max(p[1] for p in p_list))
+    y_begin, y_end = y_min, y_max
+    if rect is not None:
+        y_begin, y_end = max(y_begin, rect[1]), min(y_end, rect[3])
     polygon_len = len(p_list)
 
-    def get_valid_index(index):
-        return (index + polygon_len)%polygon_len
-    NET = []
-    for i in range(height):
-        NET.append(None)
-
-    def NET_add(index, item):
-        if NET[index] is None:
-            NET[index] = LinkList()
-        NET[index].append(item)
-
-    for y_index in range(y_min, y_max + 1):
-        for p_index, edge in enumerate(p_list):
-            if edge[1] == y_index:
-                # 尝试将该点附近的两条边加入边表中
-                [cur_x, cur_y] = edge
-                if p_list[get_valid_index(p_index-1)][1] > cur_y:
-                    [tem_x, tem_y] = p_list[get_valid_index(p_index-1)]
-                    m = (cur_x - tem_x) / (cur_y - tem_y)
-                    NET_add(y_index, [cur_x, m, tem_y])
-
-                if p_list[get_valid_index(p_index+1)][1] > cur_y:
-                    [tem_x, tem_y] = p_list[get_valid_index(p_index+1)]
-                    m = (tem_x - cur_x) / (tem_y - cur_y)
-                    NET_add(y_index, [cur_x, m, tem_y])
-
-    def float_equal(x, y, threshold = 1e-3):
-        return (x-y)<threshold
-
-    AET = LinkList()
-    for y_index in range(y_min, y_max+1):
+    # 新边表：以下端点所在的行为键，边为[下端点x, dx/dy, 上端点y]，只需遍历一次所有的边
+    NET = {}
+    for p_index, (cur_x, cur_y) in enumerate(p_list):
+        tem_x, tem_y = p_list[(p_index + 1) % polygon_len]
+        if cur_y == tem_y:
+            continue
+        if tem_y < cur_y:
+            cur_x, cur_y, tem_x, tem_y = tem_x, tem_y, cur_x, cur_y
+        if cur_y <= y_end:
+            NET.setdefault(cur_y, []).append([cur_x, (tem_x - cur_x) / (tem_y - cur_y), tem_y])
+
+    # 跳过可见区域之前的扫描线：其间加入且未被删除的边，交点直接前进到y_begin处
+    AET = []
+    for y_index in sorted(NET):
+        if y_index >= y_begin:
+            break
+        for pre_x, m, y_top in NET[y_index]:
+            if not y_index <= y_top < y_begin:
+                AET.append([repeat_add(pre_x, m, y_begin - y_index), m, y_top])
+
+    for y_index in range(y_begin, y_end + 1):
         # 从边表中加边
-        if NET[y_index] is not None:
-            cur_node = NET[y_index].head
-            while cur_node is not None:
-                AET.append(cur_node.data)
-                cur_node = cur_node.next
-
+        AET += [list(edge) for edge in NET.get(y_index, [])]
         # 删除边
-        if not AET.is_empty():
-            cur_node = AET.head
-            while cur_node is not None:
-                [pre_x, m, y_top] = cur_node.data
-                if y_top == y_index:
-                    cur_node = cur_node.next
-                    AET.remove([pre_x, m, y_top])
-                    continue
-                cur_node = cur_node.next
-
+        AET = [edge for edge in AET if edge[2] != y_index]
         # 扫描填充
-        x_list = []
-        if not AET.is_empty():
-            cur_node = AET.head
-            while cur_node is not None:
-                [pre_x, m, y_top] = cur_node.data
-                cur_node = cur_node.next
-                x_list.append(pre_x)
+        if len(AET) > 0:
+            yield y_index, sorted(edge[0] for edge in AET)
+        # 更新边
+        for edge in AET:
+            edge[0] += edge[1]
 
-            x_list.sort()
 
-            for x_index in range(0, len(x_list), 2):
-                x_1 = x_list[x_index]
-                x_2 = x_list[x_index+1]
-                draw_points.append([[int(x_1), int(y_index)], [int(x_2), int(y_index)]])
+def polygon_fill(p_list, height, rect=None):
+    '''
+    多边形扫描线填充
+    输入：多边形顶点坐标，画布高度，可见区域(x_min, y_min, x_max, y_max)（包含边界，为None时不限制）
+    输出：填充的像素列表，给出可见区域时只包含其中的像素，顺序不变
+    '''
+    draw_points = []
+    for y_index, x_list in polygon_scanlines(p_list, height, rect):
+        for x_index in range(0, len(x_list), 2):
+            x_1 = int(x_list[x_index])
+            x_2 = int(x_list[x_index + 1] + 1)
+            if rect is not None:
+                x_1, x_2 = max(x_1, rect[0]), min(x_2, rect[2] + 1)
+            for tem_x in range(x_1, x_2):
+                draw_points.append([tem_x, y_index])
+    return draw_points
 
-        # 更新边
-        if not AET.is_empty():
-            cur_node = AET.head
-            while cur_node is not None:
-                [pre_x, m, y_top] = cur_node.data
-                pre_x += m
-                cur_node.data = [pre_x, m, y_top]
-                cur_node = cur_node.next
+
+def polygon_fill_line(p_list, height, rect=None):
+    '''
+    多边形扫描线填充，每一段以[[x_1, y], [x_2, y]]的形式给出
+    输入：多边形顶点坐标，画布高度，可见区域(x_min, y_min, x_max, y_max)（包含边界，为None时不限制）
+    输出：填充的水平线段列表，给出可见区域时线段被截取到区域内，完全不可见的线段被丢弃
+    '''
+    draw_points = []
+    for y_index, x_list in polygon_scanlines(p_list, height, rect):
+        for x_index in range(0, len(x_list), 2):
+            x_1 = int(x_list[x_index])
+            x_2 = int(x_list[x_index + 1])
+            if rect is not None:
+                x_1, x_2 = max(x_1, rect[0]), min(x_2, rect[2])
+                if x_1 > x_2:
+                    continue
+            draw_points.append([[x_1, y_index], [x_2, y_index]])
     return draw_points
@@ -0,0 +1,773 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 本文件是my_algorithms的NumPy批量实现。直线、多边形填充、B样条曲线和分段Bezier曲线等与my_algorithms中对应的算法逐像素一致；
+# 唯一的例外是Bezier曲线（get_bezier_points）：以Bernstein基矩阵相乘求和的顺序不同，
+# 恰好落在像素边界上的个别采样点可能取整到相邻的像素
+import math
+from functools import lru_cache
+import numpy as np
+from algorithms import my_algorithms as alg
+
+# 分块累加时单块允许的最大元素个数，用于限制补齐后的临时数组大小
+_BLOCK_SIZE = 1 << 20
+
+
+def _accumulate(starts, incs, counts):
+    '''
+    按段进行浮点累加：第i段依次产生 starts[i], starts[i] + incs[i], ... 共counts[i]个值
+    由于逐元素的加法顺序与Python中反复执行 v += inc 相同，结果的舍入也完全一致
+    :param starts: (ndarray of float) 每段的初始值
+    :param incs: (ndarray of float) 每段的增量
+    :param counts: (ndarray of int) 每段产生的值的个数
+    :return: (ndarray of float) 按段拼接后的结果
+    '''
+    counts = np.asarray(counts, np.int64)
+    offsets = np.zeros(len(counts) + 1, np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    result = np.empty(offsets[-1], np.float64)
+
+    # 按长度排序后分块，使每块补齐到相同宽度时浪费的空间较小
+    order = np.argsort(counts, kind='stable')
+    begin = 0
+    while begin < len(order):
+        end = begin + 1
+        while end < len(order) and (end - begin + 1) * counts[order[end]] <= _BLOCK_SIZE:
+            end += 1
+        index = order[begin:end]
+        begin = end
+        width = counts[index[-1]]
+        if width == 0:
+            continue
+        block = np.empty((len(index), width), np.float64)
+        block[:, 0] = starts[index]
+        block[:, 1:] = incs[index, None]
+        block = np.add.accumulate(block, axis=1)
+        valid = np.arange(width) < counts[index, None]
+        result[(offsets[index, None] + np.arange(width))[valid]] = block[valid]
+    return result
+
+
+def _segment_steps(counts):
+    '''
+    计算每个像素所属的线段编号以及在该线段内的序号
+    :param counts: (ndarray of int) 每条线段的像素个数
+    :return: (线段编号, 段内序号, 每段起始偏移)
+    '''
+    offsets = np.zeros(len(counts) + 1, np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    seg = np.repeat(np.arange(len(counts)), counts)
+    k = np.arange(offsets[-1], dtype=np.int64) - offsets[seg]
+    return seg, k, offsets
+
+
+def _visible_steps(start, direction, count, low, high):
+    '''
+    沿某个方向每步前进1（direction为0时不动）时，坐标落在[low, high]内的步数范围，与my_algorithms.visible_steps相同
+    :return: (第一步, 最后一步)，第一步大于最后一步时表示不可见
+    '''
+    forward = direction >= 0
+    first = np.maximum(0, np.where(forward, low - start, start - high))
+    last = np.minimum(count, np.where(forward, high - start, start - low))
+    return first, last
+
+
+def _visible_segment_steps(first, last):
+    '''
+    只保留每条线段中第first到第last步的像素
+    :return: (线段编号, 步数)
+    '''
+    counts = np.maximum(last - first + 1, 0)
+    seg, k, offsets = _segment_steps(counts)
+    return seg, k + first[seg]
+
+
+def _keep_visible(pixels, seg, segment_num, rect):
+    '''
+    舍弃可见区域之外的像素，并重新计算每条线段的起止偏移
+    '''
+    x_min, y_min, x_max, y_max = rect
+    keep = (pixels[:, 0] >= x_min) & (pixels[:, 0] <= x_max) & (pixels[:, 1] >= y_min) & (pixels[:, 1] <= y_max)
+    offsets = np.zeros(segment_num + 1, np.int64)
+    np.cumsum(np.bincount(seg[keep], minlength=segment_num), out=offsets[1:])
+    return pixels[keep], offsets
+
+
+def lines_naive(segments, rect=None):
+    x0, y0 = segments[:, 0, 0], segments[:, 0, 1]
+    x1, y1 = segments[:, 1, 0], segments[:, 1, 1]
+    vertical = x0 == x1
+    # 非竖直线段统一转化为从左到右
+    swap = ~vertical & (x0 > x1)
+    x0, y0, x1, y1 = np.where(swap, x1, x0), np.where(swap, y1, y0), np.where(swap, x0, x1), np.where(swap, y0, y1)
+    counts = np.where(vertical, np.maximum(y1 - y0 + 1, 0), x1 - x0 + 1)
+    if rect is None:
+        seg, k, offsets = _segment_steps(counts)
+    else:
+        # 只遍历可见的列（竖直线段为可见的行）
+        first, last = _visible_steps(np.where(vertical, y0, x0), 1, counts - 1,
+                                     np.where(vertical, rect[1], rect[0]), np.where(vertical, rect[3], rect[2]))
+        seg, k = _visible_segment_steps(first, last)
+
+    dx = np.where(vertical, 1, x1 - x0)
+    slope = (y1 - y0) / dx
+    xs = np.where(vertical[seg], x0[seg], x0[seg] + k)
+    ys = np.where(vertical[seg], y0[seg] + k, np.trunc(y0[seg] + slope[seg] * k))
+    pixels = np.stack([xs, ys], axis=1).astype(np.int32)
+    if rect is None:
+        return pixels, offsets
+    return _keep_visible(pixels, seg, len(segments), rect)
+
+
+def lines_dda(segments, rect=None):
+    x0, y0 = segments[:, 0, 0], segments[:, 0, 1]
+    x1, y1 = segments[:, 1, 0], segments[:, 1, 1]
+    dx = x1 - x0
+    dy = y1 - y0
+    step = np.maximum(np.abs(dx), np.abs(dy))  # 选择较大的一者作为遍历的跨度
+
+    # 主方向的增量恰好为±1，累加没有舍入误差；次方向需要按段逐次累加以保持相同的舍入
+    x_major = np.abs(dx) >= np.abs(dy)
+    major_start = np.where(x_major, x0, y0)
+    major_dir = np.sign(np.where(x_major, dx, dy))
+    minor_start = np.where(x_major, y0, x0).astype(np.float64)
+    minor_inc = np.where(x_major, dy, dx) / np.where(step == 0, 1, step)
+
+    if rect is None:
+        counts = step + 1
+        seg, k, offsets = _segment_steps(counts)
+    else:
+        # 由主方向的可见范围确定需要遍历的步数，次方向的起始值用闭式跳过之前的累加
+        first, last = _visible_steps(major_start, major_dir, step,
+                                     np.where(x_major, rect[0], rect[1]), np.where(x_major, rect[2], rect[3]))
+        counts = np.maximum(last - first + 1, 0)
+        seg, k = _visible_segment_steps(first, last)
+        for i in np.nonzero((first > 0) & (counts > 0))[0]:
+            minor_start[i] = alg.repeat_add(float(minor_start[i]), float(minor_inc[i]), int(first[i]))
+    major_coord = major_start[seg] + k * major_dir[seg]
+    # 起点直接取端点坐标，之后的点与int()一样向零取整
+    minor_coord = np.trunc(_accumulate(minor_start, minor_inc, counts))
+
+    pixels = np.empty((len(seg), 2), np.int32)
+    major_pixel = x_major[seg]
+    pixels[:, 0] = np.where(major_pixel, major_coord, minor_coord)
+    pixels[:, 1] = np.where(major_pixel, minor_coord, major_coord)
+    if rect is None:
+        return pixels, offsets
+    return _keep_visible(pixels, seg, len(segments), rect)
+
+
+def lines_Bresenham(segments, rect=None):
+    x0, y0 = segments[:, 0, 0], segments[:, 0, 1]
+    x1, y1 = segments[:, 1, 0], segments[:, 1, 1]
+    dx = x1 - x0
+    dy = y1 - y0
+    abs_dx = np.abs(dx)
+    abs_dy = np.abs(dy)
+    # 斜率绝对值小于等于1时沿x方向遍历，否则沿y方向遍历
+    shallow = abs_dy <= abs_dx
+    major = np.where(shallow, abs_dx, abs_dy)
+    minor = np.where(shallow, abs_dy, abs_dx)
+    # 区间转化为沿主方向递增
+    from_start = np.where(shallow, dx >= 0, dy >= 0)
+    sx = np.where(from_start, x0, x1)
+    sy = np.where(from_start, y0, y1)
+    sign = np.where(((dx < 0) & (dy < 0)) | ((dx > 0) & (dy > 0)), 1, -1)
+    major_start = np.where(shallow, sx, sy)
+    minor_start = np.where(shallow, sy, sx)
+
+    if rect is None:
+        counts = major + 1
+        seg, k, offsets = _segment_steps(counts)
+    else:
+        # 主方向的可见范围
+        major_low, major_high = np.where(shallow, rect[0], rect[1]), np.where(shallow, rect[2], rect[3])
+        first, last = _visible_steps(major_start, 1, major, major_low, major_high)
+        # 次方向的可见范围：前进次数在[m_low, m_high]内的步数，与my_algorithms.bresenham_visible_steps相同
+        minor_low, minor_high = np.where(shallow, rect[1], rect[0]), np.where(shallow, rect[3], rect[2])
+        m_low = np.where(sign > 0, minor_low - minor_start, minor_start - minor_high)
+        m_high = np.where(sign > 0, minor_high - minor_start, minor_start - minor_low)
+        flat = minor == 0
+        safe_minor = np.where(flat, 1, 2 * minor)
+        m_low_clipped = np.maximum(m_low, 0)
+        first = np.maximum(first, np.where(flat, 0, -((major - 2 * major * m_low_clipped) // safe_minor)))
+        last = np.minimum(last, np.where(flat, major, (2 * major * (m_high + 1) - major - 1) // safe_minor))
+        hidden = np.where(flat, (m_low > 0) | (m_high < 0), m_low_clipped > m_high)
+        last = np.where(hidden, -1, last)
+        seg, k = _visible_segment_steps(first, last)
+
+    # 第k个像素在主方向上前进k，在次方向上前进的次数即决策变量累计非负的次数floor((2*minor*k + major) / (2*major))
+    minor_steps = (2 * minor[seg] * k + major[seg]) // (2 * np.where(major == 0, 1, major)[seg])
+
+    pixels = np.empty((len(seg), 2), np.int32)
+    major_pixel = shallow[seg]
+    major_coord = k + major_start[seg]
+    minor_coord = minor_steps * sign[seg] + minor_start[seg]
+    pixels[:, 0] = np.where(major_pixel, major_coord, minor_coord)
+    pixels[:, 1] = np.where(major_pixel, minor_coord, major_coord)
+    if rect is None:
+        return pixels, offsets
+    offsets = np.zeros(len(segments) + 1, np.int64)
+    np.cumsum(np.bincount(seg, minlength=len(segments)), out=offsets[1:])
+    return pixels, offsets
+
+
+def draw_lines(segments, algorithm, rect=None):
+    """批量绘制线段
+
+    :param segments: (array-like of int, shape (N, 2, 2)) N条线段的起点和终点坐标
+    :param algorithm: (string) 绘制使用的算法，包括'Naive'、'DDA'和'Bresenham'
+    :param rect: (tuple) 可见区域(x_min, y_min, x_max, y_max)，包含边界；给出时只计算线段的可见部分，
+        结果与不给出时位于该区域内的像素完全相同
+    :return: (ndarray of int32 (P, 2), ndarray of int64 (N + 1,)) 所有线段的像素点坐标，以及每条线段在其中的起止偏移，
+             第i条线段的像素为 pixels[offsets[i]:offsets[i + 1]]，与my_algorithms.draw_line的结果逐像素一致
+    """
+    segments = np.asarray(segments, np.int64).reshape(-1, 2, 2)
+    if algorithm == 'Naive':
+        return lines_naive(segments, rect)
+    elif algorithm == 'DDA':
+        return lines_dda(segments, rect)
+    elif algorithm == 'Bresenham':
+        return lines_Bresenham(segments, rect)
+    return None
+
+
+def polyline_segments(p_list, closed=True):
+    '''
+    将折线或多边形的顶点转化为线段数组，线段顺序与my_algorithms.draw_polygon一致
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], ...]) 顶点坐标
+    :param closed: 是否首尾相连
+    :return: (ndarray of int64, shape (N, 2, 2)) 线段数组
+    '''
+    points = np.asarray(p_list, np.int64).reshape(-1, 2)
+    if closed:
+        return np.stack([np.roll(points, 1, axis=0), points], axis=1)
+    return np.stack([points[:-1], points[1:]], axis=1)
+
+
+def cull_segments(segments, clip_rect):
+    '''
+    光栅化的预处理：舍弃完全位于clip_rect之外的线段（用Liang-Barsky算法判断）
+    部分可见的线段保持不变，因为裁剪后端点的舍入会改变整条线段的光栅化结果
+    :param segments: (ndarray, shape (N, 2, 2)) 线段的起点和终点坐标
+    :param clip_rect: (tuple) 可见区域(x_min, y_min, x_max, y_max)，包含边界
+    :return: (ndarray, shape (M, 2, 2)) 按原顺序排列的、需要光栅化的线段
+    '''
+    x_min, y_min, x_max, y_max = clip_rect
+    segments = np.asarray(segments).reshape(-1, 2, 2)
+    keep = clip_lines_liang_barsky(segments, x_min, y_max, x_max, y_min)[1]
+    return segments[keep]
+
+
+def draw_polygon(p_list, algorithm, finish=True, clip_rect=None):
+    """绘制多边形，一次批量光栅化所有边
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 多边形的顶点坐标列表
+    :param algorithm: (string) 绘制使用的算法，包括'DDA'和'Bresenham'
+    :param finish: 多边形是否已经闭合
+    :param clip_rect: (tuple) 可见区域(x_min, y_min, x_max, y_max)，给出时只计算其中的像素
+    :return: (ndarray of int32, shape (P, 2)) 绘制结果的像素点坐标
+    """
+    if len(p_list) == 0:
+        return np.empty((0, 2), np.int32)
+    return draw_lines(polyline_segments(p_list, finish), algorithm, clip_rect)[0]
+
+
+def draw_control_points(p_list, algorithm):
+    """绘制曲线的控制点连线（不需要首尾相连）
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 曲线的控制点坐标
+    :param algorithm: (string) 绘制使用的算法，包括'DDA'和'Bresenham'
+    :return: (ndarray of int32, shape (P, 2)) 绘制结果的像素点坐标
+    """
+    if len(p_list) < 2:
+        return np.empty((0, 2), np.int32)
+    return draw_lines(polyline_segments(p_list, False), algorithm)[0]
+
+
+@lru_cache(maxsize=None)
+def sample_parameters(step_num):
+    '''
+    曲线的采样参数t，与my_algorithms中反复执行 t += 1.0 / step_num 得到的值完全一致
+    '''
+    t = np.full(step_num, 1.0 / step_num)
+    t[0] = 0.0
+    t = np.add.accumulate(t)
+    t.setflags(write=False)
+    return t
+
+
+@lru_cache(maxsize=None)
+def log_binomials(n):
+    '''
+    n阶的组合数C(n, i)（i = 0..n）的自然对数，每个阶数只计算一次
+    组合数本身在n超过1029时会超出浮点数范围，因此以对数形式保存
+    '''
+    result = np.array([math.log(math.comb(n, i)) for i in range(n + 1)])
+    result.setflags(write=False)
+    return result
+
+
+@lru_cache(maxsize=64)
+def bernstein_matrix(n, step_num):
+    '''
+    n阶Bernstein基函数在各采样参数t（见sample_parameters）处的取值
+    :param n: (int) bezier曲线的阶数，即控制点个数减一
+    :param step_num: (int) 采样点个数
+    :return: (ndarray of float, shape (step_num, n + 1)) 只读的基函数矩阵，第j行第i列为C(n, i) * t_j^i * (1 - t_j)^(n - i)
+    '''
+    t = sample_parameters(step_num)
+    i = np.arange(n + 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # t = 0时log(t)为-inf，i = 0的项单独取0，避免出现0 * inf
+        t_term = np.where(i == 0, 0.0, i * np.log(t)[:, None])
+        mt_term = np.where(i == n, 0.0, (n - i) * np.log1p(-t)[:, None])
+    result = np.exp(log_binomials(n) + t_term + mt_term)
+    result.setflags(write=False)
+    return result
+
+
+def get_bezier_points(p_list, step_num=1000):
+    '''
+    以矩阵乘法一次计算bezier曲线上所有采样点的坐标，求和顺序与my_algorithms不同，个别采样点可能有舍入差异
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], ...]) 控制点坐标
+    :param step_num: (int) 采样点个数
+    :return: (ndarray of float, shape (step_num, 2)) 采样点坐标
+    '''
+    points = np.asarray(p_list, np.float64).reshape(-1, 2)
+    return bernstein_matrix(len(points) - 1, step_num) @ points
+
+
+# 三次均匀B样条的基矩阵（乘以6之后），各行依次为一段曲线的u^3、u^2、u、1项系数关于该段四个控制点的权重
+B_SPLINE_MATRIX = np.array([[-1, 3, -3, 1],
+                            [3, -6, 3, 0],
+                            [-3, 0, 3, 0],
+                            [1, 4, 1, 0]], np.float64)
+
+
+def b_spline_coefficients(p_list, first=0, last=None):
+    '''
+    计算三次均匀B样条第first到last-1段的多项式系数，第i段只与第i到i+3个控制点有关
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], ...]) 控制点坐标，至少4个
+    :param first: (int) 起始段号
+    :param last: (int) 结束段号（不含），为None时计算到最后一段
+    :return: (ndarray of float, shape (last - first, 4, 2)) 各段曲线u^3、u^2、u、1项的系数
+    '''
+    if last is None:
+        last = len(p_list) - 3
+    points = np.asarray(p_list[first:last + 3], np.float64).reshape(-1, 2)
+    seg_num = last - first
+    windows = np.stack([points[j:j + seg_num] for j in range(4)], axis=1)
+    # 先求整数加权和再除以6，与my_algorithms.get_B_spline的舍入一致
+    return np.einsum('ij,sjk->sik', B_SPLINE_MATRIX, windows) / 6.0
+
+
+@lru_cache(maxsize=64)
+def b_spline_parameters(seg_num, step_num):
+    '''
+    每个采样点所在的段号以及段内参数u的各次幂：每个采样参数直接算出所在的段，不再逐个扫描节点向量
+    :param seg_num: (int) 曲线段数，即控制点个数减3
+    :param step_num: (int) 在整条曲线上均匀采样的个数
+    :return: (tuple of ndarray) 只读的段号数组，shape (step_num,)（单调不减）；只读的u^3、u^2、u数组，shape (step_num, 3)
+    '''
+    knots = np.arange(seg_num + 1) * (1 / seg_num)
+    t = sample_parameters(step_num)
+
+    # 由t直接得到段号，再与节点比较修正浮点误差，使结果与逐个扫描节点向量相同
+    seg = np.minimum((t * seg_num).astype(np.int64), seg_num - 1)
+    seg -= (seg > 0) & (knots[seg] > t)
+    seg += (seg < seg_num - 1) & (knots[np.minimum(seg + 1, seg_num)] <= t)
+    u = (t - knots[seg]) / (knots[seg + 1] - knots[seg])
+    u2 = u * u
+    powers = np.stack([u2 * u, u2, u], axis=1)
+    seg.setflags(write=False)
+    powers.setflags(write=False)
+    return seg, powers
+
+
+def evaluate_b_spline(coefficients, seg, powers):
+    '''
+    由各段系数计算采样点坐标
+    :param coefficients: (ndarray of float, shape (n - 3, 4, 2)) b_spline_coefficients的结果
+    :param seg: (ndarray of int) 采样点所在的段号
+    :param powers: (ndarray of float, shape (len(seg), 3)) 采样点的u^3、u^2、u
+    :return: (ndarray of float, shape (len(seg), 2)) 采样点坐标
+    '''
+    c = coefficients[seg]
+    u3, u2, u = powers[:, 0:1], powers[:, 1:2], powers[:, 2:3]
+    return c[:, 0] * u3 + c[:, 1] * u2 + c[:, 2] * u + c[:, 3]
+
+
+def get_B_spline_points(p_list, step_num=1000):
+    '''
+    计算三次均匀B样条曲线上所有采样点的坐标
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], ...]) 控制点坐标，至少4个
+    :param step_num: (int) 在整条曲线上均匀采样的个数
+    :return: (ndarray of float, shape (step_num, 2)) 采样点坐标
+    '''
+    coefficients = b_spline_coefficients(p_list)
+    seg, powers = b_spline_parameters(len(coefficients), step_num)
+    return evaluate_b_spline(coefficients, seg, powers)
+
+
+def piecewise_bezier_segments(p_list, first=0, last=None):
+    '''
+    分段三次bezier曲线第first到last-1段的控制点，构造方式与my_algorithms.piecewise_bezier_segment相同
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], ...]) 点坐标，至少2个
+    :param first: (int) 起始段号
+    :param last: (int) 结束段号（不含），为None时计算到最后一段
+    :return: (ndarray of float, shape (last - first, 4, 2)) 各段的4个控制点
+    '''
+    points = np.asarray(p_list, np.float64).reshape(-1, 2)
+    n = len(points)
+    if last is None:
+        last = n - 1
+    i = np.arange(first, last)
+    p_prev, p0 = points[np.maximum(i - 1, 0)], points[i]
+    p3, p_next = points[i + 1], points[np.minimum(i + 2, n - 1)]
+    return np.stack([p0, p0 + (p3 - p_prev) / 6.0, p3 - (p_next - p0) / 6.0, p3], axis=1)
+
+
+def piecewise_bezier_pixels(p_list, first=0, last=None):
+    '''
+    绘制分段三次bezier曲线的第first到last-1段，每段的采样与my_algorithms.draw_piecewise_bezier_segment完全一致
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], ...]) 点坐标，至少2个
+    :param first: (int) 起始段号
+    :param last: (int) 结束段号（不含），为None时计算到最后一段
+    :return: (tuple) 像素点坐标(ndarray of int32, shape (P, 2))；各段在其中的起止位置(ndarray of int64, shape (S + 1,))
+    '''
+    segments = piecewise_bezier_segments(p_list, first, last)
+    legs = segments[:, 1:] - segments[:, :-1]
+    longest = np.sqrt(legs[..., 0] * legs[..., 0] + legs[..., 1] * legs[..., 1]).max(axis=1, initial=0.0)
+    counts = (3 * longest).astype(np.int64) + 1
+    offsets = np.zeros(len(counts) + 1, np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    t = _accumulate(np.zeros(len(counts)), 1.0 / counts, counts)[:, None]
+    mt = 1 - t
+    control = np.repeat(segments, counts, axis=0)
+    points = (mt * mt * mt * control[:, 0] + 3 * mt * mt * t * control[:, 1] +
+              3 * mt * t * t * control[:, 2] + t * t * t * control[:, 3])
+    pixels = np.trunc(points).astype(np.int32)
+
+    # 去掉每段内连续重复的像素
+    keep = np.ones(len(pixels), bool)
+    keep[1:] = (pixels[1:] != pixels[:-1]).any(axis=1)
+    keep[offsets[:-1]] = True
+    np.cumsum(np.add.reduceat(keep, offsets[:-1]), out=offsets[1:])
+    return pixels[keep], offsets
+
+
+def draw_piecewise_bezier(p_list):
+    '''
+    绘制分段三次bezier曲线，结果与my_algorithms.draw_piecewise_bezier相同
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], ...]) 点坐标
+    :return: (ndarray of int32, shape (P, 2)) 像素点坐标
+    '''
+    pixels = piecewise_bezier_pixels(p_list)[0] if len(p_list) > 1 else np.empty((0, 2), np.int32)
+    return np.concatenate([pixels, np.trunc(np.asarray([p_list[-1]], np.float64)).astype(np.int32)])
+
+
+def draw_curve(p_list, algorithm, tolerance=None):
+    """绘制曲线，参数与my_algorithms.draw_curve相同
+
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], [x2, y2], ...]) 曲线的控制点坐标列表
+    :param algorithm: (string) 绘制使用的算法，包括'Bezier'、'B-spline'和'Bezier-piecewise'
+    :param tolerance: (float) Bezier曲线自适应展平的容差（像素），为None时按固定的1000个参数步长采样
+    :return: (ndarray of int32, shape (P, 2)) 绘制结果的像素点坐标
+    """
+    if algorithm == 'Bezier' and tolerance is None:
+        # 与int()一样向零取整
+        return np.trunc(get_bezier_points(p_list)).astype(np.int32)
+    elif algorithm == 'B-spline':
+        return np.trunc(get_B_spline_points(p_list)).astype(np.int32)
+    elif algorithm == 'Bezier-piecewise':
+        return draw_piecewise_bezier(p_list)
+    return np.asarray(alg.draw_curve(p_list, algorithm, tolerance), np.int32).reshape(-1, 2)
+
+
+def apply_matrix(m, p_list):
+    '''
+    批量进行仿射变换，运算顺序与my_algorithms.apply_matrix相同，结果完全一致
+    :param m: 3x3仿射变换矩阵
+    :param p_list: 点坐标列表或(N, 2)的数组
+    :return: (ndarray of float64, shape (N, 2)) 变换后的浮点坐标
+    '''
+    (a, b, c), (d, e, f) = m[0], m[1]
+    points = np.asarray(p_list, np.float64).reshape(-1, 2)
+    x, y = points[:, 0], points[:, 1]
+    return np.stack([a * x + b * y + c, d * x + e * y + f], axis=1)
+
+
+def clip_lines_liang_barsky(segments, x_min, y_min, x_max, y_max):
+    '''
+    使用Liang-Barsky算法批量裁剪线段，每条线段的结果（包括舍入）与my_algorithms.clip_liang_barsky相同
+    :param segments: (ndarray, shape (N, 2, 2)) 线段的起点和终点坐标
+    :param x_min: 裁剪窗口左上角x坐标
+    :param y_min: 裁剪窗口左上角y坐标
+    :param x_max: 裁剪窗口右下角x坐标
+    :param y_max: 裁剪窗口右下角y坐标
+    :return: (tuple) 裁剪后的线段(ndarray of int64, shape (N, 2, 2))，被舍弃的线段对应的行没有意义；
+        是否保留各线段(ndarray of bool, shape (N,))
+    '''
+    segments = np.asarray(segments).reshape(-1, 2, 2)
+    x_0, y_0 = segments[:, 0, 0], segments[:, 0, 1]
+    delta_x = segments[:, 1, 0] - x_0
+    delta_y = segments[:, 1, 1] - y_0
+    p = np.stack([-delta_x, delta_x, -delta_y, delta_y], axis=1)
+    q = np.stack([x_0 - x_min, x_max - x_0, y_0 - y_max, y_min - y_0], axis=1)
+
+    # 与窗口某条边平行且位于其外侧的线段直接舍弃
+    keep = ~((p == 0) & (q < 0)).any(axis=1)
+    u_tem = np.divide(q, p, out=np.zeros(p.shape), where=p != 0)
+    u_begin = np.max(np.where(p < 0, u_tem, 0.0), axis=1, initial=0.0)
+    u_end = np.min(np.where(p > 0, u_tem, 1.0), axis=1, initial=1.0)
+    keep &= u_begin <= u_end
+
+    # np.round与round()一样采用银行家舍入
+    result = np.empty((len(segments), 2, 2), np.int64)
+    result[:, 0, 0] = np.round(x_0 + u_begin * delta_x)
+    result[:, 0, 1] = np.round(y_0 + u_begin * delta_y)
+    result[:, 1, 0] = np.round(x_0 + u_end * delta_x)
+    result[:, 1, 1] = np.round(y_0 + u_end * delta_y)
+    return result, keep
+
+
+def clip_lines(segments, x_min, y_min, x_max, y_max):
+    '''
+    批量裁剪线段，对窗口坐标的处理与my_algorithms.clip相同
+    :param segments: (ndarray, shape (N, 2, 2)) 线段的起点和终点坐标
+    :param x_min: 裁剪窗口左上角x坐标
+    :param y_min: 裁剪窗口左上角y坐标
+    :param x_max: 裁剪窗口右下角x坐标
+    :param y_max: 裁剪窗口右下角y坐标
+    :return: (tuple) 同clip_lines_liang_barsky
+    '''
+    if x_min > x_max:
+        x_min, x_max = x_max, x_min
+    if y_min < y_max:
+        y_min, y_max = y_max, y_min
+    return clip_lines_liang_barsky(segments, x_min, y_min, x_max, y_max)
+
+
+def polygon_edge_table(p_list, y_max):
+    '''
+    构造多边形的边表：每条非水平边从下端点（y较小的一端）开始，对y属于[下端点y, 上端点y)的扫描线有交点，
+    与my_algorithms.polygon_fill的规则相同；顶点为浮点坐标（如裁剪得到的多边形）时从下端点之上的第一条扫描线开始
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], ...]) 多边形的顶点坐标
+    :param y_max: (int) 最后一条扫描线，超出的部分不计算
+    :return: (tuple of ndarray) 各边按下端点y排序后的下端点x、斜率的倒数dx/dy、下端点y、交点个数（即覆盖的扫描线数）
+    '''
+    points = np.asarray(p_list, np.float64).reshape(-1, 2)
+    start, end = points, np.roll(points, -1, axis=0)
+    edges = start[:, 1] != end[:, 1]  # 水平边不参与求交
+    start, end = start[edges], end[edges]
+    upward = (start[:, 1] < end[:, 1])[:, None]
+    lower = np.where(upward, start, end)
+    upper = np.where(upward, end, start)
+
+    y_start = np.ceil(lower[:, 1])
+    y_top = np.ceil(upper[:, 1]).astype(np.int64)
+    slopes = (upper[:, 0] - lower[:, 0]) / (upper[:, 1] - lower[:, 1])
+    x_start = lower[:, 0] + (y_start - lower[:, 1]) * slopes  # 整数顶点时即为下端点x
+    y_start = y_start.astype(np.int64)
+    counts = np.maximum(np.minimum(y_top, y_max + 1) - y_start, 0)
+    order = np.argsort(y_start, kind='stable')
+    return x_start[order], slopes[order], y_start[order], counts[order]
+
+
+def skip_rows(x_start, slopes, y_start, counts, y_begin):
+    '''
+    光栅化的预处理：跳过可见区域之前的扫描线，与my_algorithms.polygon_scanlines相同，
+    在y_begin之前开始的边的交点用repeat_add直接前进到y_begin处，结果与逐行累加完全一致
+    :param x_start: (ndarray of float) 各边的起始交点x，即polygon_edge_table的返回值
+    :param slopes: (ndarray of float) 各边斜率的倒数dx/dy
+    :param y_start: (ndarray of int) 各边的起始扫描线
+    :param counts: (ndarray of int) 各边的交点个数
+    :param y_begin: (int) 第一条需要计算的扫描线
+    :return: (tuple of ndarray) 跳过之后的x_start, y_start, counts
+    '''
+    skipped = np.minimum(np.maximum(y_begin - y_start, 0), counts)
+    x_start, y_start, counts = x_start.copy(), y_start + skipped, counts - skipped
+    for i in np.flatnonzero((skipped > 0) & (counts > 0)):
+        x_start[i] = alg.repeat_add(float(x_start[i]), float(slopes[i]), int(skipped[i]))
+    return x_start, y_start, counts
+
+
+def clamp_spans(spans, clip_rect):
+    '''
+    将填充区间限制在可见区域的列范围内，与my_algorithms.polygon_fill相同，并去掉空区间
+    :param spans: (ndarray of int64, shape (M, 3)) 填充区间(y, x0, x1)，包含两个端点
+    :param clip_rect: (tuple) 可见区域(x_min, y_min, x_max, y_max)，包含边界，为None时不限制
+    :return: (ndarray of int64, shape (K, 3)) 可见区域内的填充区间
+    '''
+    if clip_rect is None:
+        return spans
+    spans[:, 1] = np.maximum(spans[:, 1], clip_rect[0])
+    spans[:, 2] = np.minimum(spans[:, 2], clip_rect[2])
+    return spans[spans[:, 1] <= spans[:, 2]]
+
+
+def polygon_fill_crossings(p_list, height, clip_rect=None):
+    '''
+    扫描线与多边形各边的交点，交点的x坐标由下端点x逐行累加dx/dy得到，舍入与my_algorithms.polygon_fill完全一致
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], ...]) 多边形的顶点坐标
+    :param height: (int) 画布高度，只计算y < height的扫描线
+    :param clip_rect: (tuple) 可见区域(x_min, y_min, x_max, y_max)，给出时只计算其中的扫描线，交点不受影响
+    :return: (tuple of ndarray) 每个填充区间的扫描线y（int64）、左端交点x、右端交点x（float）
+    '''
+    if len(p_list) < 3:
+        return np.empty(0, np.int64), np.empty(0), np.empty(0)
+    y_max = min(height - 1, int(np.floor(np.max(np.asarray(p_list)[:, 1]))))
+    if clip_rect is not None:
+        y_max = min(y_max, clip_rect[3])
+    x_start, slopes, y_start, counts = polygon_edge_table(p_list, y_max)
+    if clip_rect is not None:
+        x_start, y_start, counts = skip_rows(x_start, slopes, y_start, counts, clip_rect[1])
+    offsets = np.zeros(len(counts) + 1, np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    xs = _accumulate(x_start, slopes, counts)
+    ys = np.repeat(y_start - offsets[:-1], counts) + np.arange(offsets[-1])
+    # 同一扫描线上的交点按x排序后两两配对
+    order = np.lexsort((xs, ys))
+    xs, ys = xs[order], ys[order]
+    return ys[0::2], xs[0::2], xs[1::2]
+
+
+def polygon_fill_spans(p_list, height, clip_rect=None):
+    '''
+    多边形扫描线填充，结果与my_algorithms.polygon_fill_line相同，但以数组形式返回
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], ...]) 多边形的顶点坐标
+    :param height: (int) 画布高度
+    :param clip_rect: (tuple) 可见区域(x_min, y_min, x_max, y_max)，给出时只包含其中的部分
+    :return: (ndarray of int64, shape (M, 3)) 每行为一个填充区间(y, x0, x1)，包含两个端点
+    '''
+    ys, x_left, x_right = polygon_fill_crossings(p_list, height, clip_rect)
+    spans = np.stack([ys, np.trunc(x_left).astype(np.int64), np.trunc(x_right).astype(np.int64)], axis=1)
+    return clamp_spans(spans, clip_rect)
+
+
+def spans_to_pixels(spans):
+    '''
+    将填充区间展开为像素点
+    :param spans: (ndarray of int, shape (M, 3)) 填充区间(y, x0, x1)，包含两个端点，x1 < x0的区间为空
+    :return: (ndarray of int64, shape (P, 2)) 按区间顺序排列的像素点坐标
+    '''
+    spans = np.asarray(spans, np.int64).reshape(-1, 3)
+    counts = np.maximum(spans[:, 2] - spans[:, 1] + 1, 0)
+    offsets = np.zeros(len(counts) + 1, np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    pixels = np.empty((offsets[-1], 2), np.int64)
+    pixels[:, 0] = np.repeat(spans[:, 1] - offsets[:-1], counts) + np.arange(offsets[-1])
+    pixels[:, 1] = np.repeat(spans[:, 0], counts)
+    return pixels
+
+
+def polygon_fill_pixel_spans(p_list, height, clip_rect=None):
+    '''
+    多边形扫描线填充的区间，覆盖的像素与my_algorithms.polygon_fill相同
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], ...]) 多边形的顶点坐标
+    :param height: (int) 画布高度
+    :param clip_rect: (tuple) 可见区域(x_min, y_min, x_max, y_max)，给出时只包含其中的部分
+    :return: (ndarray of int64, shape (M, 3)) 每行为一个填充区间(y, x0, x1)，包含两个端点
+    '''
+    ys, x_left, x_right = polygon_fill_crossings(p_list, height, clip_rect)
+    # 与my_algorithms.polygon_fill一样，右端点取int(x + 1) - 1
+    spans = np.stack([ys, np.trunc(x_left).astype(np.int64), np.trunc(x_right + 1).astype(np.int64) - 1], axis=1)
+    return clamp_spans(spans, clip_rect)
+
+
+def polygon_fill(p_list, height):
+    '''
+    多边形扫描线填充，结果与my_algorithms.polygon_fill相同
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], ...]) 多边形的顶点坐标
+    :param height: (int) 画布高度
+    :return: (ndarray of int64, shape (P, 2)) 填充的像素点坐标
+    '''
+    return spans_to_pixels(polygon_fill_pixel_spans(p_list, height))
+
+
+def spans_to_mask(spans, mask, x_min=0, y_min=0, value=1):
+    '''
+    将填充区间写入掩码：每个区间在差分数组中记录起点和终点，按行求前缀和即得到覆盖情况，不需要逐个像素写入
+    :param spans: (ndarray of int, shape (M, 3)) 填充区间(y, x0, x1)，包含两个端点
+    :param mask: (ndarray of bool or uint8, shape (h, w)) 对应矩形区域[x_min, x_min + w) x [y_min, y_min + h)，原地修改
+    :param x_min: (int) 矩形区域左边界
+    :param y_min: (int) 矩形区域上边界
+    :param value: 写入被覆盖位置的值
+    :return: (ndarray) mask
+    '''
+    h, w = mask.shape
+    spans = np.asarray(spans, np.int64).reshape(-1, 3)
+    rows = spans[:, 0] - y_min
+    x0 = np.maximum(spans[:, 1] - x_min, 0)
+    x1 = np.minimum(spans[:, 2] - x_min, w - 1)
+    valid = (0 <= rows) & (rows < h) & (x0 <= x1)
+    rows, x0, x1 = rows[valid], x0[valid], x1[valid]
+
+    size = h * (w + 1)
+    diff = np.bincount(rows * (w + 1) + x0, minlength=size) - np.bincount(rows * (w + 1) + x1 + 1, minlength=size)
+    covered = np.cumsum(diff.reshape(h, w + 1)[:, :w], axis=1) > 0
+    mask[covered] = value
+    return mask
+
+
+def polygon_fill_mask(p_list, mask, x_min=0, y_min=0, value=1):
+    '''
+    多边形扫描线填充，直接写入调用者提供的矩形区域掩码，覆盖的像素与my_algorithms.polygon_fill相同
+    只计算矩形区域内的扫描线，区间限制在矩形区域的列范围内
+    :param p_list: (list of list of int: [[x0, y0], [x1, y1], ...]) 多边形的顶点坐标
+    :param mask: (ndarray of bool or uint8, shape (h, w)) 对应矩形区域[x_min, x_min + w) x [y_min, y_min + h)，原地修改
+    :param x_min: (int) 矩形区域左边界
+    :param y_min: (int) 矩形区域上边界
+    :param value: 写入被覆盖位置的值
+    :return: (ndarray) mask
+    '''
+    h, w = mask.shape
+    spans = polygon_fill_pixel_spans(p_list, y_min + h, (x_min, y_min, x_min + w - 1, y_min + h - 1))
+    return spans_to_mask(spans, mask, x_min, y_min, value)
+
+
+def segments_distance(segments, x, y):
+    '''
+    点(x, y)到一组线段的最短距离，用于精确的点击测试
+    :param segments: (ndarray, shape (N, 2, 2)) 线段的起点和终点坐标
+    :param x: (float) 点的x坐标
+    :param y: (float) 点的y坐标
+    :return: (float) 最短距离，没有线段时为inf
+    '''
+    segments = np.asarray(segments, np.float64).reshape(-1, 2, 2)
+    if len(segments) == 0:
+        return math.inf
+    start = segments[:, 0]
+    d = segments[:, 1] - start
+    v = np.array([x, y], np.float64) - start
+    length2 = np.einsum('ij,ij->i', d, d)
+    # 投影到线段上的参数，退化为一个点的线段取起点
+    t = np.clip(np.einsum('ij,ij->i', v, d) / np.where(length2 > 0, length2, 1), 0, 1)
+    offset = v - t[:, None] * d
+    return math.sqrt(np.einsum('ij,ij->i', offset, offset).min())
+
+
+def points_distance(points, x, y):
+    '''
+    点(x, y)到一组点（如光栅化得到的像素点）的最短距离
+    :param points: (ndarray, shape (N, 2)) 点的坐标
+    :return: (float) 最短距离，没有点时为inf
+    '''
+    points = np.asarray(points, np.float64).reshape(-1, 2)
+    if len(points) == 0:
+        return math.inf
+    offset = points - (x, y)
+    return math.sqrt(np.einsum('ij,ij->i', offset, offset).min())
+
+
+def spans_contain(spans, x, y):
+    '''
+    判断像素(x, y)是否被一组水平区间覆盖
+    :param spans: (ndarray, shape (N, 3)) 区间[(y, x0, x1), ...]，包含两个端点
+    :return: (bool)
+    '''
+    spans = np.asarray(spans).reshape(-1, 3)
+    return bool(np.any((spans[:, 0] == y) & (spans[:, 1] <= x) & (x <= spans[:, 2])))
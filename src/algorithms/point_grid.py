@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 本文件是控制点的均匀网格索引，用于快速查找离鼠标位置最近的控制点
+import math
+import numpy as np
+from algorithms.point_list import PointList
+
+
+def cell_key(cx, cy):
+    '''
+    把格子坐标(cx, cy)编码为一个整数，先按cx、再按cy排序
+    '''
+    return cx * (1 << 32) + cy
+
+
+class PointGrid(object):
+    """
+    控制点的均匀网格索引：建立时把所有点按所在格子排序后保存在数组中，
+    之后移动或追加的点记录在按格子分组的字典中，查询时只检查附近的格子
+
+    Attributes:
+        cell_size: 格子的边长
+        points: 各点当前的坐标
+        keys: 建立索引时各点所在格子的编码（已排序）
+        order: 与keys对应的点的索引
+        moved: 不再位于建立索引时的位置的点（包括追加的点）
+        extra: 这些点按格子分组，{(cx, cy): {index, ...}}
+    """
+    __slots__ = ('cell_size', 'points', 'keys', 'order', 'moved', 'extra')
+
+    def __init__(self, p_list, cell_size):
+        """
+
+        :param p_list: 控制点的整数坐标
+        :param cell_size: (int) 格子的边长
+        """
+        self.cell_size = cell_size
+        self.points = PointList(p_list)
+        cells = np.asarray(self.points, np.int64).reshape(-1, 2) // cell_size
+        keys = cell_key(cells[:, 0], cells[:, 1])
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+        self.moved = set()
+        self.extra = {}
+
+    def cell(self, point):
+        return point[0] // self.cell_size, point[1] // self.cell_size
+
+    def move(self, index, point):
+        '''
+        把第index个点移动到point
+        '''
+        if index in self.moved:
+            self.extra[self.cell(self.points[index])].discard(index)
+        else:
+            self.moved.add(index)
+        self.points[index] = point
+        self.extra.setdefault(self.cell(point), set()).add(index)
+
+    def append(self, point):
+        '''
+        在末尾追加一个点
+        '''
+        index = len(self.points)
+        self.points.append(point)
+        self.moved.add(index)
+        self.extra.setdefault(self.cell(point), set()).add(index)
+
+    def nearest(self, x, y, max_dis):
+        '''
+        查找离(x, y)最近的点
+        :param max_dis: 只考虑距离不超过max_dis的点
+        :return: (int) 点的索引，距离相同时取索引较大的点，没有这样的点时返回-1
+        '''
+        cx, cy = self.cell((math.floor(x), math.floor(y)))
+        r = math.ceil(max_dis / self.cell_size)
+        best, best_dis = -1, max_dis ** 2
+        for i in range(cx - r, cx + r + 1):
+            begin, end = np.searchsorted(self.keys, [cell_key(i, cy - r), cell_key(i, cy + r + 1)])
+            candidates = [index for index in self.order[begin:end].tolist() if index not in self.moved]
+            for j in range(cy - r, cy + r + 1):
+                candidates.extend(self.extra.get((i, j), ()))
+            for index in candidates:
+                px, py = self.points[index]
+                dis = (x - px) ** 2 + (y - py) ** 2
+                if dis < best_dis or (dis == best_dis and index > best):
+                    best, best_dis = index, dis
+        return best
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# 本文件是紧凑的点坐标序列，用来代替图元中的[[x0, y0], [x1, y1], ...]
+from array import array
+import numpy as np
+
+
+class PointList(object):
+    """
+    紧凑的点坐标序列：所有坐标依次保存在一个array中，每个点只占两个数
+    （整数每个点8字节，浮点每个点16字节，列表套列表则要100字节以上）
+    下标访问和迭代得到[x, y]，与[[x0, y0], [x1, y1], ...]的用法相同，因此可以直接交给my_algorithms，
+    np.asarray则直接从内存复制出(N, 2)的数组，可以交给np_algorithms
+    由同类型的PointList构造（包括copy和deepcopy）时与它共享同一个array，任何一方原地修改之前才复制（写时复制）
+
+    Attributes:
+        data: 坐标array，依次为x0, y0, x1, y1, ...
+        shared: data是否可能还被其他PointList引用
+    """
+    __slots__ = ('data', 'shared')
+
+    def __init__(self, points=(), typecode='i'):
+        """
+
+        :param points: 点坐标序列，可以是列表、PointList或(N, 2)的ndarray
+        :param typecode: (str) array的类型码，'i'为整数坐标，'d'为浮点坐标
+        """
+        self.shared = False
+        if isinstance(points, PointList) and points.data.typecode == typecode:
+            self.data = points.data
+            self.shared = points.shared = True
+        elif isinstance(points, (PointList, np.ndarray)):
+            if isinstance(points, PointList):  # 类型码不同时借助NumPy整块转换，逐个元素转换要慢得多
+                points = np.frombuffer(points.data, points.data.typecode)
+            self.data = array(typecode, np.ascontiguousarray(points, typecode).tobytes())
+        else:
+            self.data = array(typecode, [v for p in points for v in (p[0], p[1])])
+
+    def __len__(self):
+        return len(self.data) // 2
+
+    def __iter__(self):
+        it = iter(self.data)
+        return ([x, y] for x, y in zip(it, it))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                result = PointList((), self.data.typecode)
+                result.data = self.data[2 * start:2 * max(start, stop)]
+                return result
+            return PointList([self[i] for i in range(start, stop, step)], self.data.typecode)
+        index = self._check_index(index)
+        return [self.data[2 * index], self.data[2 * index + 1]]
+
+    def __setitem__(self, index, point):
+        index = self._check_index(index)
+        self._own()
+        self.data[2 * index] = point[0]
+        self.data[2 * index + 1] = point[1]
+
+    def _check_index(self, index):
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError('PointList index out of range')
+        return index
+
+    def _own(self):
+        '''
+        原地修改之前调用：data与其他PointList共享时先复制一份
+        '''
+        if self.shared:
+            self.data = self.data[:]
+            self.shared = False
+
+    def append(self, point):
+        self._own()
+        self.data.append(point[0])
+        self.data.append(point[1])
+
+    def tolist(self):
+        '''
+        转换为[[x0, y0], [x1, y1], ...]，用于保存为JSON
+        '''
+        return list(self)
+
+    def copy(self):
+        return PointList(self, self.data.typecode)
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __reduce__(self):
+        return PointList, (self.tolist(), self.data.typecode)
+
+    def __array__(self, dtype=None, copy=None):
+        points = np.frombuffer(self.data, self.data.typecode).reshape(-1, 2)
+        return points.astype(points.dtype if dtype is None else dtype)  # 总是复制，不把内部的缓冲区暴露出去
+
+    def __eq__(self, other):
+        try:
+            return len(self) == len(other) and all(p == list(q) for p, q in zip(self, other))
+        except TypeError:
+            return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'PointList({})'.format(self.tolist())
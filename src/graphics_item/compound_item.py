@@ -10,16 +10,33 @@ class CompoundItem(PPItem):
     def __init__(self, item_id: str, item_type: str, p_list: list, algorithm: str = '', parent: QGraphicsItem = None):
         super(CompoundItem, self).__init__(item_id, 'composite', None, None, parent)
         self.itemList = []
+        self.changed_items = []  # 包围框改变、但原包围框位于组合包围框内部的组成部分
 
     def appendItem(self, item):
         # if item is not subclass of PPItem, then do not append them
         if not issubclass(type(item), PPItem):
             return
 
+        self.prepare_geometry_change()
         self.itemList.append(item)
+        item.group = self
         item.unableSelect()
         return self  # for chain call
 
+    def child_geometry_changed(self, item, old_rect):
+        '''
+        组成部分的几何形状改变时由它调用。它原来的包围框严格位于组合包围框内部时，组合包围框的边界
+        都由其他组成部分决定，之后只需要并上它的新包围框；否则重新合并所有组成部分（各自都有缓存）
+        :param item: 发生改变的组成部分
+        :param old_rect: (QRectF) 它改变之前的包围框，未计算过时为None
+        '''
+        rect = None if self._bounding_rect is None else self.boundingRect()  # 先并上之前的改变
+        self.prepare_geometry_change()
+        if rect is not None and old_rect is not None and rect.left() < old_rect.left() and \
+                rect.top() < old_rect.top() and old_rect.right() < rect.right() and old_rect.bottom() < rect.bottom():
+            self._bounding_rect = rect
+            self.changed_items.append(item)
+
     def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: Optional[QWidget] = ...) -> None:
         for item in self.itemList:
             item.paint(painter, option, widget)
@@ -28,26 +45,43 @@ class CompoundItem(PPItem):
             self.drawBoundingBox(painter)
 
     def boundingRect(self) -> QRectF:
-        # iterate all the boundingRect of the items
-        # get the boundingRect of all the rect
+        rect = super(CompoundItem, self).boundingRect()
+        if self.changed_items:
+            for item in self.changed_items:
+                rect = rect.united(item.boundingRect())
+            self.changed_items = []
+            self._bounding_rect = rect
+        return rect
+
+    def compute_bounding_rect(self) -> QRectF:
+        # get the union of the (cached) outline_rect of all the items, boundingRect adds the hit tolerance again
         assert len(self.itemList) >= 1
-        cur_rect = QRectF(self.itemList[0].boundingRect())
-
-        for item in self.itemList:
+        self.changed_items = []
+        cur_rect = self.itemList[0].outline_rect()
+        for item in self.itemList[1:]:
+            cur_rect = cur_rect.united(item.outline_rect())
+        return cur_rect
 
-            com_rect = QRectF(item.boundingRect())
-            p1_x = min(cur_rect.x(), com_rect.x())
-            p1_y = min(cur_rect.y(), com_rect.y())
-            p2_x = max(cur_rect.x() + cur_rect.width(), com_rect.x() + com_rect.width())
-            p2_y = max(cur_rect.y() + cur_rect.height(), com_rect.y() + com_rect.height())
+    def hit_test(self, x, y):
+        # 组合图元没有自己的控制点，点中任何一个组成部分即可
+        return any(item.hit_shape(x, y) for item in self.itemList)
 
-            cur_rect = QRectF(p1_x, p1_y, p2_x - p1_x, p2_y - p1_y)
+    def clone(self):
+        cloned_object = CompoundItem(self.id, 'composite', None, None)
+        for item in self.itemList:  # deep copy every item in itemlist
+            cloned_object.appendItem(item.clone())
+        return cloned_object
 
-        return cur_rect
+    def make_prototype(self):
+        prototype = CompoundItem(self.id, 'composite', None, None)
+        for item in self.itemList:
+            prototype.appendItem(item.make_prototype())
+        return prototype
 
-    def clone(self):
+    def instantiate(self, dx, dy):
         cloned_object = CompoundItem(self.id, 'composite', None, None)
-        cloned_object.itemList = [item.clone() for item in self.itemList]  # deep copy every item in itemlist
+        for item in self.itemList:  # 每个组成部分都是对应母版的实例
+            cloned_object.appendItem(item.instantiate(dx, dy))
         return cloned_object
 
     def __find_nearest_control_point(self, x, y, max_dis=30):
@@ -1,9 +1,10 @@
-import copy
 from typing import Optional
 
-from PyQt5.QtCore import QRectF,Qt
-from PyQt5.QtGui import QPainter, QColor, QPen
-from algorithms import my_algorithms as alg
+import numpy as np
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QPainter, QPen
+from algorithms import np_algorithms as np_alg
 from PyQt5.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem, QWidget
 from graphics_item.pp_item import PPItem
 
@@ -11,19 +12,147 @@ from graphics_item.pp_item import PPItem
 class CurveItem(PPItem):
     def __init__(self, item_id: str, item_type: str, p_list: list, algorithm: str = '', parent: QGraphicsItem = None):
         super(CurveItem, self).__init__(item_id, 'curve', p_list, algorithm, parent)
+        self.tolerance = None  # Bezier曲线自适应展平的容差（像素），为None时使用固定步长采样
+        # 三次B样条的缓存：各段系数和采样点，移动一个控制点时只重算与它相关的至多四段
+        self.spline_coefficients = None
+        self.spline_pixels = None
+        # 分段三次Bezier曲线每一段的像素点，修改一个点时只重算与它相关的至多四段
+        self.segment_pixels = None
+        # 以上缓存都是相对cache_anchor（见PPItem.raster_anchor）的坐标，对应形状版本号cache_version
+        self.cache_anchor = None
+        self.cache_version = None
+
+    def set_tolerance(self, tolerance):
+        self.tolerance = tolerance
+        return self
+
+    def geometry_changed(self, index=None):
+        if index is None and self.cache_version == self._shape_version:
+            # 整数平移：相对形状不变，缓存仍然有效，只是所相对的原点随之平移
+            self.cache_anchor = self.raster_anchor()
+            return
+        if index is None or self.cache_anchor != self.raster_anchor():
+            self.drop_caches()  # 相对坐标的原点改变时，未修改的控制点的相对坐标也变了
+            return
+        if self.algorithm == 'B-spline':
+            self.update_b_spline(index)
+        elif self.algorithm == 'Bezier-piecewise':
+            self.update_piecewise_bezier(index)
+        self.cache_version = self._shape_version
+
+    def drop_caches(self):
+        self.spline_coefficients = None
+        self.spline_pixels = None
+        self.segment_pixels = None
+        self.cache_version = None
+
+    def relative_points(self):
+        '''
+        相对raster_anchor的控制点坐标，按段缓存的结果都在相对坐标下计算，平移之后仍然有效
+        '''
+        return np.asarray(self.p_list, np.int64) - self.raster_anchor()
+
+    def update_b_spline(self, index):
+        if self.spline_coefficients is None:
+            return
+        seg_num = len(self.p_list) - 3
+        if index is None or seg_num < 1:
+            self.spline_coefficients = None
+        elif seg_num == len(self.spline_coefficients):
+            # 第index个控制点只影响第index-3到index段
+            first = max(index - 3, 0)
+            last = min(index, seg_num - 1) + 1
+            self.spline_coefficients[first:last] = np_alg.b_spline_coefficients(self.relative_points(), first, last)
+            seg, powers = np_alg.b_spline_parameters(seg_num, len(self.spline_pixels))
+            lo, hi = np.searchsorted(seg, [first, last])
+            points = np_alg.evaluate_b_spline(self.spline_coefficients, seg[lo:hi], powers[lo:hi])
+            self.spline_pixels[lo:hi] = np.trunc(points)
+        elif seg_num == len(self.spline_coefficients) + 1 and index == len(self.p_list) - 1:
+            # 追加控制点只新增最后一段，已有各段的系数不变；采样点在各段上的分布随段数改变，需要整体重新求值
+            self.spline_coefficients = np.concatenate(
+                [self.spline_coefficients, np_alg.b_spline_coefficients(self.relative_points(), seg_num - 1)])
+            self.update_spline_pixels()
+        else:
+            self.spline_coefficients = None
+
+    def update_piecewise_bezier(self, index):
+        if self.segment_pixels is None:
+            return
+        seg_num = len(self.p_list) - 1
+        if index is None or seg_num < 1:
+            self.segment_pixels = None
+        elif seg_num == len(self.segment_pixels) or \
+                (seg_num == len(self.segment_pixels) + 1 and index == len(self.p_list) - 1):
+            # 第index个点只影响第index-2到index+1段，追加的点只影响原来的最后一段和新增的一段
+            first = max(index - 2, 0)
+            last = min(index + 1, seg_num - 1) + 1
+            pixels, offsets = np_alg.piecewise_bezier_pixels(self.relative_points(), first, last)
+            self.segment_pixels[first:last] = np.split(pixels, offsets[1:-1])
+        else:
+            self.segment_pixels = None
+
+    def update_spline_pixels(self):
+        seg, powers = np_alg.b_spline_parameters(len(self.spline_coefficients), 1000)
+        self.spline_pixels = np.trunc(np_alg.evaluate_b_spline(self.spline_coefficients, seg, powers)).astype(np.int32)
+
+    def get_curve_pixels(self, step=1):
+        '''
+        计算曲线的像素点，B样条曲线和分段Bezier曲线使用按段缓存的结果
+        :param step: 细节层次（见PPItem.level_of_detail），大于1时Bezier曲线按step / 2的容差自适应展平，
+            B样条曲线只取1 / step的采样点
+        :return: (ndarray of int32, shape (P, 2)) 相对raster_anchor的像素点坐标，控制点不足时返回None
+        '''
+        if self.cache_version != self._shape_version:
+            self.drop_caches()
+        points = self.relative_points()
+        if step > 1 and self.algorithm == 'Bezier':
+            return np_alg.draw_curve(points.tolist(), self.algorithm, max(step / 2, self.tolerance or 0))
+        if self.algorithm == 'Bezier-piecewise' and len(points) > 1:
+            if self.segment_pixels is None:
+                pixels, offsets = np_alg.piecewise_bezier_pixels(points)
+                self.segment_pixels = np.split(pixels, offsets[1:-1])
+                self.cache_anchor, self.cache_version = self.raster_anchor(), self._shape_version
+            return np.concatenate(self.segment_pixels + [points[-1:].astype(np.int32)])
+        if self.algorithm != 'B-spline':
+            return np_alg.draw_curve(points.tolist(), self.algorithm, self.tolerance)
+        if len(points) < 4:  # 需要注意三次b样条曲线需要至少四个控制点
+            return None
+        if self.spline_coefficients is None:
+            self.spline_coefficients = np_alg.b_spline_coefficients(points)
+            self.update_spline_pixels()
+            self.cache_anchor, self.cache_version = self.raster_anchor(), self._shape_version
+        if step > 1:
+            seg, powers = np_alg.b_spline_parameters(len(self.spline_coefficients), max(1000 // step, 16))
+            return np.trunc(np_alg.evaluate_b_spline(self.spline_coefficients, seg, powers)).astype(np.int32)
+        return self.spline_pixels
+
+    def has_outline(self):
+        return self.algorithm != 'B-spline' or len(self.p_list) >= 4  # 三次B样条曲线需要至少四个控制点
+
+    def raster_outline(self, as_array=False, step=1):
+        # 在相对坐标下计算（见PPItem.rasterize_relative），平移曲线时不需要重新求值
+        return self.get_raster('outline', lambda rect: self.rasterize_relative(
+            lambda points, rect: self.get_curve_pixels(step), self.p_list, rect),
+            (self.algorithm, self.tolerance), as_array=as_array, step=step, shift_invariant=True)
+
+    def hit_shape(self, x, y):
+        # 光栅化得到的像素点是相邻的，到它们的距离就是到曲线的距离（误差不超过一个像素）
+        if not self.has_outline():
+            return False
+        (ox, oy), pixels = self.raster_outline(as_array=True)
+        return np_alg.points_distance(pixels, x - ox, y - oy) <= self.hit_tolerance
 
     def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: Optional[QWidget] = ...) -> None:
+        lod = self.level_of_detail(option, painter)
+        if lod == 0:
+            self.paint_box(painter)
+            return
         painter.setPen(self.color)
-        item_pixels = None
-        if self.algorithm != 'B-spline' or len(self.p_list) >= 4:  # 需要注意三次b样条曲线需要至少四个控制点
-            item_pixels = alg.draw_curve(self.p_list, self.algorithm)
-        if item_pixels is not None:
-            for p in item_pixels:
-                painter.drawPoint(*p)
+        if self.has_outline():
+            origin, item_pixels = self.raster_outline(step=lod)
+            self.paint_pixels(painter, origin, item_pixels, lod)
         if not self.is_finish or self.selected:
-            painter.setPen(QColor(0, 0, 0))
-            for p in self.p_list:  # 绘制控制点
-                painter.drawRect(p[0] - 4, p[1] - 4, 8, 8)
+            self.paint_control_points(painter, lod)
 
             pen = QPen(Qt.DashLine)
             pen.setColor(Qt.blue)
@@ -37,20 +166,14 @@ class CurveItem(PPItem):
         if self.selected:
             self.drawBoundingBox(painter)
 
-    def boundingRect(self) -> QRectF:
-        x0, y0 = self.p_list[0]
-        x, y, w, h = x0, y0, x0, y0
-        for (X, Y) in self.p_list:
-            x = min(x, X)
-            y = min(y, Y)
-            w = max(w, X)
-            h = max(h, Y)
-        w -= x
-        h -= y
-        return QRectF(x - 1, y - 1, w + 2, h + 2)
-
     def clone(self):
-        cloned_obj =  CurveItem(self.id, self.item_type, copy.deepcopy(self.p_list), self.algorithm)
+        cloned_obj = CurveItem(self.id, self.item_type, self._master, self.algorithm).share_geometry(self)
         cloned_obj.setFinish(True) \
-            .setColor(self.color)
-        return cloned_obj
\ No newline at end of file
+            .setColor(self.color) \
+            .set_tolerance(self.tolerance)
+        return cloned_obj
+
+    def dump_as_dict(self):  # 记录展平容差
+        tem = super(CurveItem, self).dump_as_dict()
+        tem["tolerance"] = self.tolerance
+        return tem
\ No newline at end of file
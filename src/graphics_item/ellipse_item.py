@@ -1,8 +1,11 @@
 import copy
+import math
 from typing import Optional
 from PyQt5.QtCore import QRectF
 from PyQt5.QtGui import QPainter, QColor
 from algorithms import my_algorithms as alg
+from algorithms import ellipse_algorithms as ellipse_alg
+from algorithms import np_algorithms as np_alg
 from PyQt5.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem, QWidget
 from graphics_item.pp_item import PPItem
 
@@ -10,55 +13,109 @@ from graphics_item.pp_item import PPItem
 class EllipseItem(PPItem):
     def __init__(self, item_id: str, item_type: str, p_list: list, algorithm: str = '', parent: QGraphicsItem = None):
         super(EllipseItem, self).__init__(item_id, 'ellipse', p_list, algorithm, parent)
+        # p_list为旋转前的包围框，椭圆再绕中心顺时针旋转angle度
+        self.angle = 0.0
+        self.center = None  # 中心(cx, cy)，由p_list得到
+        self.radii = None  # 半轴长(a, b)，由p_list得到
         self.paint_list = copy.deepcopy(self.p_list)
         self.setPaintList()
+        self.fill = False
+        self.fill_color = QColor(255, 255, 255)
+
+    def set_fill(self, fill_color):
+        self.damage()
+        self.fill = True
+        self.fill_color = fill_color
+        return self
+
+    def set_angle(self, angle):
+        self.prepare_geometry_change()
+        self.angle = angle % 360
+        return self
 
     def setPaintList(self):
         x1, y1 = self.p_list[0]
         x2, y2 = self.p_list[1]
         self.paint_list[0] = [min(x1, x2), max(y1, y2)]
         self.paint_list[1] = [max(x1, x2), min(y1, y2)]
+        self.center, self.radii = ellipse_alg.ellipse_frame(self.p_list)
+
+    def geometry_changed(self, index=None):
+        self.setPaintList()
+
+    def raster_outline(self, as_array=False, step=1):
+        return self.get_raster('outline', lambda rect: self.rasterize_relative(
+            lambda points, rect: ellipse_alg.draw_ellipse(points.tolist(), rect, self.angle), self.paint_list, rect),
+            (self.angle,), as_array=as_array, step=step, shift_invariant=True)
+
+    def raster_fill(self, as_array=False, step=1):
+        return self.get_raster('fill', lambda rect: self.rasterize_relative(
+            lambda points, rect: ellipse_alg.ellipse_spans(points.tolist(), rect, self.angle), self.paint_list, rect,
+            spans=True), (self.angle,), spans=True, as_array=as_array, step=step, shift_invariant=True)
+
+    def hit_shape(self, x, y):
+        # 点中轮廓，或者点中填充的内部
+        (ox, oy), pixels = self.raster_outline(as_array=True)
+        if np_alg.points_distance(pixels, x - ox, y - oy) <= self.hit_tolerance:
+            return True
+        if self.fill:
+            (ox, oy), spans = self.raster_fill(as_array=True)
+            return np_alg.spans_contain(spans, math.floor(x) - ox, math.floor(y) - oy)
+        return False
 
     def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: Optional[QWidget] = ...) -> None:
+        lod = self.level_of_detail(option, painter)
+        if lod == 0:
+            self.paint_box(painter)
+            return
+        # 先按行填充内部，再绘制轮廓
+        if self.fill:
+            origin, spans = self.raster_fill(step=lod)
+            self.paint_spans(painter, origin, spans, self.fill_color)
         painter.setPen(self.color)
-        item_pixels = alg.draw_ellipse(self.paint_list)
-        self.setPaintList()
-        for p in item_pixels:
-            painter.drawPoint(*p)
+        origin, item_pixels = self.raster_outline(step=lod)
+        self.paint_pixels(painter, origin, item_pixels, lod)
         if not self.is_finish or self.selected:
-            painter.setPen(QColor(0, 0, 0))
-            for p in self.p_list:  # 绘制控制点
-                painter.drawRect(p[0] - 4, p[1] - 4, 8, 8)
+            self.paint_control_points(painter, lod)
         if self.selected:
             self.drawBoundingBox(painter)
 
-    def boundingRect(self) -> QRectF:
-        x0, y0 = self.p_list[0]
-        x1, y1 = self.p_list[1]
-        left = min(x0, x1)
-        top = min(y0, y1)
-        return QRectF(left, top, abs(x1 - x0) + 2, abs(y1 - y0) + 2)
+    def compute_bounding_rect(self) -> QRectF:
+        x0, y0, x1, y1 = self.get_vertex_bounds()
+        rect = QRectF(x0, y0, x1 - x0 + 2, y1 - y0 + 2)
+        if self.angle % 180 != 0:
+            # 旋转后的椭圆可能超出旋转前的包围框（控制点仍位于旋转前的包围框上）
+            w, h = ellipse_alg.rotated_extent(self.radii, self.angle)
+            cx, cy = self.center
+            rect = rect.united(QRectF(cx - w - 1, cy - h - 1, 2 * w + 3, 2 * h + 3))
+        return rect
 
     def update_control_point(self, x, y):
         super().update_control_point(x, y)
         self.setPaintList()
 
     def clone(self):
-        cloned_obj =  EllipseItem(self.id, self.item_type, copy.deepcopy(self.p_list), self.algorithm)
+        cloned_obj = EllipseItem(self.id, self.item_type, self._master, self.algorithm).share_geometry(self)
         cloned_obj.setFinish(True) \
-            .setColor(self.color)
+            .setColor(self.color) \
+            .set_angle(self.angle)
+        if self.fill:
+            cloned_obj.set_fill(self.fill_color)
         return cloned_obj
 
-    def translate(self, dx, dy):
-        self.p_list = alg.translate(self.p_list, dx, dy)
-        self.setPaintList()
-
-    def rotate(self, xc, yc, r):
-        pass
+    def dump_as_dict(self):  # 记录是否填充以及旋转的信息
+        tem = super(EllipseItem, self).dump_as_dict()
+        tem["center"] = list(self.center)
+        tem["radii"] = list(self.radii)
+        tem["angle"] = self.angle
+        tem["fill"] = self.fill
+        tem["fill_color"] = [self.fill_color.red(), self.fill_color.green(), self.fill_color.blue()]
+        return tem
 
-    def scale(self, xc, yc, s):
-        self.p_list = alg.scale(self.p_list, xc, yc, s)
 
-    def scale(self, xc, yc, s):
-        self.p_list = alg.scale(self.p_list, xc, yc, s)
-        self.setPaintList()
\ No newline at end of file
+    def rotate(self, xc, yc, r):
+        # 旋转前的包围框只随中心平移，椭圆本身只需累加旋转角，绘制代价与轴对齐时相同
+        (cx, cy), _ = ellipse_alg.ellipse_frame(self.get_points())
+        (nx, ny), = alg.apply_matrix(alg.rotate_matrix(xc, yc, r), [[cx, cy]])
+        self.set_angle(self.angle + r)
+        self.translate(nx - cx, ny - cy)
\ No newline at end of file
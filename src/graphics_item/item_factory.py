@@ -15,7 +15,7 @@ class ItemFactory:
     '''
 
     def __init__(self):
-        pass
+        self.presets = {}  # 预设图形（三角形、方形、圆形）的母版，见get_preset
 
     def get_item(self, item_id: str, item_type: str, p_list: list, algorithm: str = ''):
         if item_type == 'line':
@@ -37,3 +37,14 @@ class ItemFactory:
         elif item_type == 'circle':
             return CircleItem(item_id, item_type, p_list, algorithm)
 
+    def get_preset(self, item_id: str, item_type: str, x: int, y: int, algorithm: str = ''):
+        '''
+        在(x, y)处生成一个预设图形（'triangle'、'square'、'circle'）：同一种预设图形都是同一个母版的实例，
+        共享几何数据和光栅化结果
+        '''
+        key = (item_type, algorithm)
+        if key not in self.presets:
+            self.presets[key] = self.get_item(item_id, item_type, [[0, 0]], algorithm).make_prototype()
+        item = self.presets[key].instantiate(x, y).setId(item_id)
+        item.setZValue(int(item_id))
+        return item
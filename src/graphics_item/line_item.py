@@ -1,10 +1,9 @@
 from typing import Optional
-from PyQt5.QtCore import QRectF
-from PyQt5.QtGui import QPainter, QColor
+from PyQt5.QtGui import QPainter
 from algorithms import my_algorithms as alg
+from algorithms import np_algorithms as np_alg
 from PyQt5.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem, QWidget
 from graphics_item.pp_item import PPItem
-import copy
 
 
 class LineItem(PPItem):
@@ -12,28 +11,26 @@ class LineItem(PPItem):
         super(LineItem, self).__init__(item_id, 'line', p_list, algorithm, parent)
 
     def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: Optional[QWidget] = ...) -> None:
+        lod = self.level_of_detail(option, painter)
+        if lod == 0:
+            self.paint_box(painter)
+            return
         painter.setPen(self.color)
-        item_pixels = alg.draw_line(self.p_list, self.algorithm)
-        for p in item_pixels:
-            painter.drawPoint(*p)
+        origin, item_pixels = self.get_raster(
+            'outline', lambda rect: self.rasterize_relative(
+                lambda points, rect: alg.draw_line(points.tolist(), self.algorithm, rect), self.p_list, rect),
+            (self.algorithm,), step=lod, shift_invariant=True)
+        self.paint_pixels(painter, origin, item_pixels, lod)
         if not self.is_finish or self.selected:
-            painter.setPen(QColor(0, 0, 0))
-            for p in self.p_list:  # 绘制控制点
-                painter.drawRect(p[0] - 4, p[1] - 4, 8, 8)
+            self.paint_control_points(painter, lod)
         if self.selected:
             self.drawBoundingBox(painter)
 
-    def boundingRect(self) -> QRectF:
-        x0, y0 = self.p_list[0]
-        x1, y1 = self.p_list[1]
-        x = min(x0, x1)
-        y = min(y0, y1)
-        w = max(x0, x1) - x
-        h = max(y0, y1) - y
-        return QRectF(x - 1, y - 1, w + 2, h + 2)
+    def hit_shape(self, x, y):
+        return np_alg.segments_distance(np_alg.polyline_segments(self.p_list, False), x, y) <= self.hit_tolerance
 
     def clone(self):
-        cloned_obj = LineItem(self.id, self.item_type, copy.deepcopy(self.p_list), self.algorithm)
+        cloned_obj = LineItem(self.id, self.item_type, self._master, self.algorithm).share_geometry(self)
         cloned_obj.setFinish(True)\
             .setColor(self.color)
         return cloned_obj
\ No newline at end of file
@@ -1,10 +1,10 @@
+import math
 from typing import Optional
 from graphics_item.pp_item import PPItem
-from algorithms import my_algorithms as alg
-from PyQt5.QtCore import QRectF,Qt
+from algorithms import np_algorithms as np_alg
+from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QPainter, QPen, QColor
 from PyQt5.QtWidgets import QGraphicsItem, QWidget, QStyleOptionGraphicsItem
-import copy
 
 class PolygonItem(PPItem):
     def __init__(self, item_id: str, item_type: str, p_list: list, algorithm: str = '', parent: QGraphicsItem = None):
@@ -13,26 +13,27 @@ class PolygonItem(PPItem):
         self.fill_color = QColor(255, 255, 255)
 
     def set_fill(self, fill_color):
+        self.damage()
         self.fill = True
         self.fill_color = fill_color
         return self
 
     def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: Optional[QWidget] = ...) -> None:
+        lod = self.level_of_detail(option, painter)
+        if lod == 0:
+            self.paint_box(painter)
+            return
         painter.setPen(self.color)
-        item_pixels = alg.draw_polygon(self.p_list, self.algorithm, self.is_finish)
-        for p in item_pixels:
-            painter.drawPoint(*p)
+        origin, item_pixels = self.get_raster(
+            'outline', lambda rect: self.rasterize_relative(
+                lambda points, rect: np_alg.draw_polygon(points, self.algorithm, self.is_finish, rect), self.p_list, rect),
+            (self.algorithm, self.is_finish), step=lod, shift_invariant=True)
+        self.paint_pixels(painter, origin, item_pixels, lod)
 
         # 只要是一个合格的多边形，就进行填充
         if self.fill and len(self.p_list) >= 3:
-            pen = QPen(Qt.SolidLine)
-            pen.setColor(self.fill_color)
-            painter.setPen(pen)
-            points = alg.polygon_fill_line(self.p_list, 1000)
-            for p in points:
-                [start, end] = p
-                painter.drawLine(start[0], start[1], end[0], end[1])
-                # painter.drawPoint(*p)
+            origin, spans = self.raster_fill(step=lod)
+            self.paint_spans(painter, origin, spans, self.fill_color)
 
         if self.selected:
             pen = QPen(Qt.DashLine)
@@ -40,29 +41,30 @@ class PolygonItem(PPItem):
             pen.setCapStyle(Qt.FlatCap)
             pen.setDashPattern((3, 3))
             painter.setPen(pen)
-            painter.drawRect(self.boundingRect())
+            painter.drawRect(self.outline_rect())
 
             ### 测试多边形填充
 
         if not self.is_finish or self.selected:
-            painter.setPen(QColor(0, 0, 0))
-            for p in self.p_list:  # 绘制控制点
-                painter.drawRect(p[0] - 4, p[1] - 4, 8, 8)
+            self.paint_control_points(painter, lod)
+
+    def raster_fill(self, as_array=False, step=1):
+        # 相对坐标下画布高度不再有意义，超出场景的行由可见区域裁剪
+        return self.get_raster('fill', lambda rect: self.rasterize_relative(
+            lambda points, rect: np_alg.polygon_fill_spans(points, points[:, 1].max() + 1, rect), self.p_list, rect,
+            spans=True), spans=True, as_array=as_array, step=step, shift_invariant=True)
 
-    def boundingRect(self) -> QRectF:
-        x0, y0 = self.p_list[0]
-        x, y, w, h = x0, y0, x0, y0
-        for (X, Y) in self.p_list:
-            x = min(x, X)
-            y = min(y, Y)
-            w = max(w, X)
-            h = max(h, Y)
-        w -= x
-        h -= y
-        return QRectF(x - 1, y - 1, w + 2, h + 2)
+    def hit_shape(self, x, y):
+        # 点中边，或者点中填充的内部
+        if np_alg.segments_distance(np_alg.polyline_segments(self.p_list, self.is_finish), x, y) <= self.hit_tolerance:
+            return True
+        if self.fill and len(self.p_list) >= 3:
+            (ox, oy), spans = self.raster_fill(as_array=True)
+            return np_alg.spans_contain(spans, math.floor(x) - ox, math.floor(y) - oy)
+        return False
 
     def clone(self):  # 重载以实现填充的复制
-        cloned_obj = PolygonItem(self.id, self.item_type, copy.deepcopy(self.p_list), self.algorithm)
+        cloned_obj = PolygonItem(self.id, self.item_type, self._master, self.algorithm).share_geometry(self)
         if self.fill:
             cloned_obj.set_fill(self.fill_color)
         cloned_obj.setFinish(True) \
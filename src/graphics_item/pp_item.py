@@ -1,14 +1,41 @@
+import itertools
+import math
 from typing import Optional
-from PyQt5.QtCore import QRectF, Qt
-from PyQt5.QtGui import QColor, QPen, QPainter
+import numpy as np
+from PyQt5.QtCore import QRect, QRectF, Qt
+from PyQt5.QtGui import QColor, QPen, QPainter, QPolygon
 from PyQt5.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem, QWidget
 from algorithms import my_algorithms as alg
+from algorithms import np_algorithms as np_alg
+from algorithms.point_list import PointList
+from algorithms.point_grid import PointGrid
+
+_shape_versions = itertools.count()  # 所有图元共用的形状版本号，见PPItem.prepare_geometry_change
+
+
+def point_buffer(points):
+    '''
+    把整数坐标数组直接写入QPolygon的内存，避免逐个构造QPoint
+    :param points: (ndarray of int32, shape (..., 2)) 点的坐标
+    :return: (QPolygon) 依次包含各点的多边形，可以交给QPainter.drawPoints
+    '''
+    points = np.ascontiguousarray(points, np.int32)
+    buffer = QPolygon(points.size // 2)
+    if points.size:
+        data = buffer.data()
+        data.setsize(points.nbytes)
+        memoryview(data)[:] = points.tobytes()
+    return buffer
 
 
 class PPItem(QGraphicsItem):
     """
     PPItem is the base item of all the graphics items
     """
+    point_grid_cell = 32  # 控制点网格索引的格子边长
+    hit_tolerance = 4  # 点击位置与轮廓的距离不超过这个值（像素）时认为点中了图元，包围框也向外扩展这么多
+    lod_detail = 0.5  # 缩放比例低于它时简化绘制，所在的视图（PPCanvas）有同名属性时以视图为准
+    lod_box_size = 3  # 在屏幕上的尺寸（像素）小于它的图元只画一个色块，同上
 
     def __init__(self, item_id: str, item_type: str, p_list: list, algorithm: str = '', parent: QGraphicsItem = None):
         """
@@ -20,9 +47,11 @@ class PPItem(QGraphicsItem):
         :param parent:
         """
         super().__init__(parent)
+        self.group = None  # 所属的组合图元，几何形状改变时需要通知它
+        self._bounding_rect = None  # 缓存的包围框
         self.id = item_id  # 图元ID
         self.item_type = item_type  # 图元类型，'line'、'polygon'、'ellipse'、'curve'等
-        self.p_list = p_list  # 图元参数
+        self.p_list = p_list  # 图元参数，实际保存为浮点的主坐标和仿射变换矩阵
         self.algorithm = algorithm  # 绘制算法，'DDA'、'Bresenham'、'Bezier'、'B-spline'等
         self.selected = False  # 当前的图元是否被选中
         self.color = QColor(0, 0, 0)  # 图元颜色
@@ -32,6 +61,220 @@ class PPItem(QGraphicsItem):
 
         self.moving_control_point = -1  # 当前正在移动的控制点索引
         self.position = None
+        self.raster_cache = {}  # 光栅化结果的缓存，见get_raster
+        self.instance_of = None  # 实例化时的母版，见instantiate
+        self._instance_check = None  # 上次检查实例与母版时的(变换矩阵, 平移量)，见instance_offset
+
+    @property
+    def p_list(self):
+        '''
+        图元参数：主坐标经过变换矩阵后取整的结果，矩阵或主坐标改变之前一直使用缓存，调用者不应原地修改
+        :return: (PointList) 整数坐标
+        '''
+        if self._p_list is None and self._master is not None:
+            points = self._master if self._matrix is None else np_alg.apply_matrix(self._matrix, self._master)
+            # np.rint与round一样四舍六入五取偶
+            self._p_list = PointList(np.rint(np.asarray(points, np.float64)).astype(np.intc))
+        return self._p_list
+
+    @p_list.setter
+    def p_list(self, p_list):
+        self.prepare_geometry_change()
+        self._master = None if p_list is None else PointList(p_list, 'd')  # 浮点的主坐标
+        self._matrix = None  # 尚未应用到主坐标上的仿射变换矩阵，None表示单位矩阵
+        self._p_list = None  # 取整后的结果的缓存
+        self._master_bounds = None  # 主坐标的范围[x_min, y_min, x_max, y_max]，None表示需要重新计算
+        self._vertex_bounds = None  # 取整后的控制点的范围(x_min, y_min, x_max, y_max)
+        self._point_grid = None  # 控制点的网格索引，在第一次查找控制点时建立
+        # 主坐标都是整数且变换矩阵为空或整数平移：此时再做整数平移，取整后的控制点恰好整体平移
+        self._integral = self._master is None or bool(np.all(np.mod(np.asarray(self._master, np.float64), 1) == 0))
+
+    def get_points(self):
+        '''
+        变换后的浮点坐标（不取整）
+        :return: (list of list of float: [[x0, y0], [x1, y1], ...])
+        '''
+        if self._matrix is None:
+            return self._master.tolist()
+        return alg.apply_matrix(self._matrix, self._master)
+
+    def transform(self, matrix):
+        '''
+        在已有的变换之后再做一次仿射变换：只与矩阵相乘，主坐标在绘制或保存时才会用到
+        :param matrix: 3x3仿射变换矩阵
+        :return: self
+        '''
+        pending, old_version = self._pending_shift, self._shape_version
+        if pending is None and self._p_list is not None:
+            pending = (self._p_list, old_version)
+        self.prepare_geometry_change()
+        self._matrix = matrix if self._matrix is None else alg.multiply_matrix(matrix, self._matrix)
+        self._p_list = None
+        self._vertex_bounds = None
+        self._point_grid = None
+        if alg.integer_translation(matrix) is None:
+            self._integral = False
+        elif self._integral:
+            self._shape_version = old_version  # 整数坐标的整数平移，相对原点的形状没有改变
+        elif pending is not None:
+            # 浮点的主坐标平移后取整不一定恰好整体平移，等到get_raster取整时再比较，这里保持O(1)
+            self._pending_shift = pending
+        self.geometry_changed()
+        return self
+
+    def shifted_by(self, points):
+        '''
+        取整后的控制点是否恰好是points整体平移一个整数向量的结果（浮点的主坐标平移后取整不一定如此）
+        :param points: (PointList) 整数坐标
+        :return: (dx, dy)，不是整数平移时返回None
+        '''
+        current, points = np.asarray(self.p_list), np.asarray(points)
+        if current.shape != points.shape or len(points) == 0:
+            return None
+        offset = current[0] - points[0]
+        if not np.array_equal(current - offset, points):
+            return None
+        return int(offset[0]), int(offset[1])
+
+    def bake_transform(self):
+        '''
+        将变换矩阵应用到主坐标上，在修改单个控制点之前调用（取整后的控制点不变）
+        '''
+        if self._matrix is not None:
+            self._master = PointList(np_alg.apply_matrix(self._matrix, self._master), 'd')
+            self._matrix = None
+            self._master_bounds = None
+
+    def share_geometry(self, other):
+        '''
+        与other共享几何数据：主坐标（写时复制的PointList）、变换矩阵以及由它们得到的缓存都直接引用other的，
+        复制图元时不复制任何坐标，之后任何一方修改控制点时才复制自己的一份
+        :param other: (PPItem) 被复制的图元
+        :return: self
+        '''
+        self.prepare_geometry_change()
+        self._master = None if other._master is None else PointList(other._master, 'd')
+        self._matrix = other._matrix
+        self._p_list = None if other._p_list is None else PointList(other._p_list)
+        self._master_bounds = other._master_bounds
+        self._vertex_bounds = other._vertex_bounds
+        self._point_grid = None
+        self.raster_cache = dict(other.raster_cache)
+        self._shape_version = other._shape_version  # 形状相同，复制来的光栅化结果仍然有效
+        self._integral = other._integral
+        self.instance_of = other.instance_of
+        self.geometry_changed()
+        return self
+
+    def make_prototype(self):
+        '''
+        复制出一个母版，用于instantiate：变换已经应用到主坐标上，主坐标的范围已经算好，由所有实例直接共享
+        母版不加入场景（因此光栅化结果总是完整的），之后也不再修改
+        :return: (PPItem) 母版
+        '''
+        prototype = self.clone()
+        prototype.bake_transform()
+        prototype.get_master_bounds()
+        return prototype
+
+    def instantiate(self, dx, dy):
+        '''
+        以自己为母版创建一个平移(dx, dy)的实例：实例是同一类的图元，与母版共享几何数据，
+        只有变换矩阵和颜色等属性是自己的；只差整数平移时可以直接使用母版的光栅化结果，见instance_offset
+        :return: (PPItem) 新的实例
+        '''
+        item = self.clone()
+        item.instance_of = self
+        item.translate(dx, dy)
+        return item
+
+    def instance_offset(self):
+        '''
+        实例相对母版的平移量。修改过控制点（主坐标已经复制）或者做过旋转、缩放之后不再是母版的平移，
+        之后自己光栅化；每个变换矩阵只检查一次取整后的控制点
+        :return: (dx, dy)，不是母版的整数平移时返回None
+        '''
+        source = self.instance_of
+        if source is None or self._master is None or self._master.data is not source._master.data:
+            return None
+        if self._integral and source._matrix is None:
+            return (0, 0) if self._matrix is None else alg.integer_translation(self._matrix)
+        if self._instance_check is None or self._instance_check[0] is not self._matrix:
+            self._instance_check = (self._matrix, self.shifted_by(source.p_list))
+        return self._instance_check[1]
+
+    def get_master_bounds(self):
+        '''
+        主坐标的范围，只在需要时整体扫描一遍，之后随单个控制点的修改增量更新
+        :return: [x_min, y_min, x_max, y_max]
+        '''
+        if self._master_bounds is None:
+            points = np.asarray(self._master, np.float64)
+            self._master_bounds = points.min(axis=0).tolist() + points.max(axis=0).tolist()
+        return self._master_bounds
+
+    def update_master_bounds(self, old, new):
+        '''
+        一个控制点的主坐标由old变为new（追加时old为None）后增量更新主坐标的范围
+        '''
+        b = self._master_bounds
+        if b is None:
+            return
+        if old is not None and ((old[0] == b[0] and new[0] > b[0]) or (old[0] == b[2] and new[0] < b[2]) or
+                                (old[1] == b[1] and new[1] > b[1]) or (old[1] == b[3] and new[1] < b[3])):
+            self._master_bounds = None  # 原来位于边界上的点向内移动，范围可能缩小，只能重新扫描
+        else:
+            self._master_bounds = [min(b[0], new[0]), min(b[1], new[1]), max(b[2], new[0]), max(b[3], new[1])]
+
+    def get_vertex_bounds(self):
+        '''
+        取整后的控制点的范围。变换矩阵不含旋转和错切时，每个坐标分量单调地变换和取整，
+        因此直接由主坐标的范围得到，不需要扫描控制点
+        :return: (x_min, y_min, x_max, y_max)
+        '''
+        if self._vertex_bounds is None:
+            m = self._matrix
+            if m is None or (m[0][1] == 0 and m[1][0] == 0):
+                x0, y0, x1, y1 = self.get_master_bounds()
+                if m is not None:
+                    (x0, y0), (x1, y1) = alg.apply_matrix(m, [[x0, y0], [x1, y1]])
+                self._vertex_bounds = (round(min(x0, x1)), round(min(y0, y1)), round(max(x0, x1)), round(max(y0, y1)))
+            else:
+                points = np.asarray(self.p_list)
+                self._vertex_bounds = tuple(points.min(axis=0).tolist() + points.max(axis=0).tolist())
+        return self._vertex_bounds
+
+    def prepare_geometry_change(self):
+        '''
+        几何形状改变之前调用：通知场景更新索引和所属的组合图元，再丢弃缓存的包围框
+        （通知的过程中Qt可能再次调用boundingRect，此时得到的仍是改变之前的包围框）；
+        同时换一个新的形状版本号，之前的光栅化结果随之失效（见get_raster）
+        '''
+        self._shape_version = next(_shape_versions)
+        self._pending_shift = None  # 尚未确认的平移：(平移之前的控制点, 形状版本号)，见transform
+        old_rect = self._bounding_rect
+        self.damage()
+        self.prepareGeometryChange()
+        if self.group is not None:
+            self.group.child_geometry_changed(self, old_rect)
+        self._bounding_rect = None
+
+    def damage(self):
+        '''
+        图元的外观即将改变时调用：让所在的视图记录改变之前的范围，改变之后的范围在重绘时再取，见PPCanvas.damage_item
+        '''
+        scene = self.scene()
+        if scene is None:
+            return
+        for view in scene.views():
+            if hasattr(view, 'damage_item'):
+                view.damage_item(self)
+
+    def itemChange(self, change, value):
+        # 加入或移出场景时，所在的区域同样需要重绘
+        if change == QGraphicsItem.ItemSceneChange or change == QGraphicsItem.ItemSceneHasChanged:
+            self.damage()
+        return super().itemChange(change, value)
 
     def setFinish(self, flag):
         self.is_finish = flag
@@ -44,6 +287,7 @@ class PPItem(QGraphicsItem):
         :param flag: 为True如果当前被选中
         :return: None
         '''
+        self.damage()
         self.selected = flag
         return self
 
@@ -51,9 +295,11 @@ class PPItem(QGraphicsItem):
         self.setFlag(QGraphicsItem.ItemIsSelectable, False)
 
     def reverseSelect(self):
+        self.damage()
         self.selected = not self.selected
 
     def setColor(self, color: QColor):
+        self.damage()
         self.color = color
         return self
 
@@ -68,36 +314,236 @@ class PPItem(QGraphicsItem):
         top_right_point = boundingRect.topRight()
         return (bottom_left_point.x() + top_right_point.x()) / 2, (bottom_left_point.y() + top_right_point.y()) / 2
 
+    def get_visible_rect(self):
+        '''
+        图元所在场景的范围，用于在光栅化之前裁剪掉不可见的部分
+        :return: (x_min, y_min, x_max, y_max)，包含边界；图元不在场景中时返回None
+        '''
+        if self.scene() is None:
+            return None
+        rect = self.scene().sceneRect()
+        return (math.floor(rect.left()), math.floor(rect.top()),
+                math.ceil(rect.right()) - 1, math.ceil(rect.bottom()) - 1)
+
+    def raster_anchor(self):
+        '''
+        光栅化使用的相对坐标原点：取整后的控制点范围的左上角，只由控制点决定，随整数平移恰好平移
+        :return: (x, y)
+        '''
+        x_min, y_min, _, _ = self.get_vertex_bounds()
+        return x_min, y_min
+
+    def rasterize_relative(self, rasterize, points, rect, spans=False):
+        '''
+        在相对raster_anchor的坐标上光栅化，再加回原点：结果只取决于相对形状，随整数平移恰好平移，
+        作为get_raster的rasterize时可以指定shift_invariant=True
+        相对坐标不为负，向零取整与绝对坐标下相同；只是浮点运算的数量级不同，个别恰好落在像素边界上的点可能取整到相邻的像素
+        :param rasterize: 函数rasterize(points, rect)，在相对坐标下返回像素点[(x, y), ...]或区间[(y, x0, x1), ...]
+        :param points: (ndarray, shape (N, 2)) 光栅化所用的整数坐标（如p_list），传给rasterize之前转换为相对坐标
+        :param rect: (tuple) 可见区域(x_min, y_min, x_max, y_max)，为None时不限制
+        :param spans: 结果是否为区间
+        :return: (ndarray of int32) 绝对坐标下的像素点(N, 2)或区间(N, 3)
+        '''
+        ax, ay = self.raster_anchor()
+        points = np.asarray(points, np.int64).reshape(-1, 2) - (ax, ay)
+        if rect is not None:
+            rect = (rect[0] - ax, rect[1] - ay, rect[2] - ax, rect[3] - ay)
+        result = rasterize(points, rect)
+        result = np.asarray([] if result is None else result, np.int32).reshape(-1, 3 if spans else 2)
+        return result + ((ay, ax, ax) if spans else (ax, ay))
+
+    def get_raster(self, name, rasterize, params=(), spans=False, as_array=False, step=1, shift_invariant=False):
+        '''
+        带缓存的光栅化：结果保存为相对图元原点（第一个控制点）的坐标，以形状版本号、算法等参数为键，
+        只改变选中状态时不会重新光栅化；结果随整数平移恰好平移时（见rasterize_relative），平移图元时也不会，只改变绘制时的偏移
+        结果直接保存为可以一次性交给QPainter的缓冲区，各帧之间重复使用
+        :param name: (str) 缓存项的名称，如'outline'、'fill'
+        :param rasterize: 函数rasterize(visible_rect)，返回绝对坐标下的像素点[(x, y), ...]或区间[(y, x0, x1), ...]
+        :param params: (tuple) 影响结果的其他参数，如绘制算法
+        :param spans: 结果是否为区间
+        :param as_array: 为True时返回相对原点的数组（点击测试使用），而不是绘制用的缓冲区
+        :param step: (int) 细节层次（见level_of_detail），大于1时区间只保留每step行中的一行、高为step，
+            像素点合并到所在的step x step块的中心；简化的结果单独缓存，不影响完整的结果
+        :param shift_invariant: 整数平移控制点时结果是否恰好随之平移（如通过rasterize_relative光栅化）；
+            为False时原点也是键的一部分，平移后必须重新光栅化
+        :return: (原点(x, y), 缓冲区) 像素点为相对原点的QPolygon，区间为相对原点、高为1的QRect列表；
+            as_array时为(原点(x, y), ndarray) 像素点的形状为(N, 2)，区间的形状为(N, 3)
+        '''
+        if self._pending_shift is not None:
+            points, version = self._pending_shift
+            self._pending_shift = None
+            if self.shifted_by(points) is not None:
+                self._shape_version = version  # 取整后恰好整体平移，沿用之前的光栅化结果
+        offset = self.instance_offset() if shift_invariant else None
+        if offset is not None:
+            # 整数平移不改变相对原点的结果：直接取母版的缓存，母版缺少缓存时由自己光栅化后平移回母版的位置
+            dx, dy = offset
+
+            def rasterize_source(rect):
+                result = np.asarray(rasterize(None), np.int32).reshape(-1, 3 if spans else 2)
+                return result - ((dy, dx, dx) if spans else (dx, dy))
+
+            (ox, oy), result = self.instance_of.get_raster(name, rasterize_source, params, spans, as_array, step, True)
+            return (ox + dx, oy + dy), result
+
+        ox, oy = self.p_list[0]
+        visible_rect = self.get_visible_rect()
+        if visible_rect is not None:
+            bound = self.outline_rect()
+            if bound.left() >= visible_rect[0] and bound.top() >= visible_rect[1] and \
+                    bound.right() <= visible_rect[2] + 1 and bound.bottom() <= visible_rect[3] + 1:
+                visible_rect = None  # 图元完全可见时结果与可见区域无关
+        relative_rect = None if visible_rect is None else (visible_rect[0] - ox, visible_rect[1] - oy,
+                                                           visible_rect[2] - ox, visible_rect[3] - oy)
+        key = (params, self._shape_version, relative_rect, step, None if shift_invariant else (ox, oy))
+        if step > 1:
+            name += '_lod'
+        cached = self.raster_cache.get(name)
+        if cached is None or cached[0] != key:
+            if spans:
+                result = np.asarray(rasterize(visible_rect), np.int32).reshape(-1, 3) - (oy, ox, ox)
+                if step > 1:
+                    result = result[result[:, 0] % step == 0]
+                buffer = [QRect(x0, y, x1 - x0 + 1, step) for y, x0, x1 in result.tolist()]
+            else:
+                result = np.asarray(rasterize(visible_rect), np.int32).reshape(-1, 2) - (ox, oy)
+                if step > 1:  # 取每个step x step块的中心，缩小后正好落在屏幕像素的中心
+                    result = np.unique(result // step * step + step // 2, axis=0)
+                buffer = point_buffer(result)
+            cached = (key, buffer, result)
+            self.raster_cache[name] = cached
+        return (ox, oy), cached[2 if as_array else 1]
+
+    def level_of_detail(self, option, painter):
+        '''
+        由视图变换确定绘制的细节层次
+        :param option: (QStyleOptionGraphicsItem) paint的参数
+        :return: (int) 1表示完整绘制；k > 1表示缩小到1/k到1/(2k)之间，取满足k × 缩放比例 <= 1的最大的2的幂，
+            每k个像素在屏幕上不足一个像素，只需保留一份细节，轮廓仍然连续；0表示图元在屏幕上太小，只画一个色块
+        '''
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        views = self.scene().views() if self.scene() is not None else []
+        canvas = views[0] if views else self
+        rect = self.outline_rect()
+        if max(rect.width(), rect.height()) * lod < getattr(canvas, 'lod_box_size', self.lod_box_size):
+            return 0
+        if lod >= getattr(canvas, 'lod_detail', self.lod_detail):
+            return 1
+        return 1 << math.floor(math.log2(1 / lod))
+
+    def paint_box(self, painter):
+        '''
+        把太小的图元画成一个色块
+        '''
+        painter.fillRect(self.outline_rect(), self.color)
+
+    def paint_control_points(self, painter, step=1):
+        '''
+        绘制控制点，缩小时（step > 1）只画点，不画方框
+        '''
+        painter.setPen(QColor(0, 0, 0))
+        if step > 1:
+            painter.drawPoints(point_buffer(np.asarray(self.p_list)))
+            return
+        for p in self.p_list:  # 绘制控制点
+            painter.drawRect(p[0] - 4, p[1] - 4, 8, 8)
+
+    @staticmethod
+    def paint_pixels(painter, origin, pixels, step=1):
+        '''
+        一次性绘制get_raster得到的像素点
+        简化绘制时（step > 1）每个点代表一块像素，使用不随缩放变细的画笔，画成一个完整的屏幕像素
+        '''
+        if step > 1:
+            pen = painter.pen()
+            pen.setCosmetic(True)
+            painter.setPen(pen)
+        painter.translate(origin[0], origin[1])
+        painter.drawPoints(pixels)
+        painter.translate(-origin[0], -origin[1])
+
+    @staticmethod
+    def paint_spans(painter, origin, spans, color):
+        '''
+        一次性用color填充get_raster得到的水平区间
+        不描边直接填充矩形与逐行画线覆盖的像素相同，但比逐条描边快得多
+        '''
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(color)
+        painter.translate(origin[0], origin[1])
+        painter.drawRects(spans)
+        painter.translate(-origin[0], -origin[1])
+        painter.setBrush(Qt.NoBrush)
+
     def drawBoundingBox(self, painter):
         pen = QPen(Qt.DashLine)
         pen.setColor(Qt.blue)
         pen.setCapStyle(Qt.FlatCap)
         pen.setDashPattern((3, 3))
         painter.setPen(pen)
-        painter.drawRect(self.boundingRect())
+        painter.drawRect(self.outline_rect())
 
     def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget: Optional[QWidget] = ...) -> None:
         painter.setPen(self.color)
         pass
 
     def boundingRect(self) -> QRectF:
-        pass
+        '''
+        缓存的包围框，几何形状改变时由prepare_geometry_change丢弃，Qt每帧多次调用时都是O(1)的
+        包围框向外扩展hit_tolerance：Qt只对包围框与点击位置相交的图元调用collidesWithPath，
+        这样轮廓附近、容差以内的点击也能选中图元，选中时绘制的控制点也在包围框之内
+        '''
+        if self._bounding_rect is None:
+            t = self.hit_tolerance
+            self._bounding_rect = self.compute_bounding_rect().adjusted(-t, -t, t, t)
+        return self._bounding_rect
 
-    # traverse all the control points and find the one which is near to (x, y)
-    # max_dis is the min distance between the control points and (x,y)
-    def __find_nearest_control_point(self, x, y, max_dis=30):
-        def get_dis(x, y, p):
-            return (x - p[0]) ** 2 + (y - p[1]) ** 2
+    def outline_rect(self) -> QRectF:
+        '''
+        不含点击容差的包围框，即compute_bounding_rect的结果，用于绘制选中框、色块等
+        '''
+        t = self.hit_tolerance
+        return self.boundingRect().adjusted(t, t, -t, -t)
+
+    def compute_bounding_rect(self) -> QRectF:
+        '''
+        计算包围框：控制点的范围向外扩展一个像素，子类可以重写
+        '''
+        x0, y0, x1, y1 = self.get_vertex_bounds()
+        return QRectF(x0 - 1, y0 - 1, x1 - x0 + 2, y1 - y0 + 2)
+
+    def hit_test(self, x, y):
+        '''
+        精确的点击测试：选中的图元在控制点附近也算点中（以便拖动控制点），其余由hit_shape按形状判断
+        Qt只对包围框包含(x, y)的图元调用它
+        :return: (bool) 是否点中了图元
+        '''
+        if self.selected and self.__find_nearest_control_point(x, y) != -1:
+            return True
+        return self.hit_shape(x, y)
 
-        min_dis = 1000000
-        min_p_index = -1
-        for index, p in enumerate(self.p_list):
-            cur_dis = get_dis(x, y, p)
-            if cur_dis <= max_dis ** 2:
-                min_dis = min(min_dis, cur_dis)
-                min_p_index = index
+    def hit_shape(self, x, y):
+        '''
+        (x, y)是否在图元的轮廓附近或填充的内部，子类重写
+        '''
+        return self.boundingRect().contains(x, y)
 
-        return min_p_index
+    def contains(self, point) -> bool:
+        return self.hit_test(point.x(), point.y())
+
+    def collidesWithPath(self, path, mode=Qt.IntersectsItemShape) -> bool:
+        # QGraphicsView.itemAt用1x1的矩形路径测试点击位置，其余情况（如框选）仍按包围框处理
+        rect = path.boundingRect()
+        if rect.width() <= 1 and rect.height() <= 1:
+            return self.hit_test(rect.x(), rect.y())
+        return super().collidesWithPath(path, mode)
+
+    # find the control point which is nearest to (x, y) through the grid index
+    # max_dis is the max distance between the control point and (x,y)
+    def __find_nearest_control_point(self, x, y, max_dis=30):
+        if self._point_grid is None:
+            self._point_grid = PointGrid(self.p_list, self.point_grid_cell)
+        return self._point_grid.nearest(x, y, max_dis)
 
     def set_control_point(self, x, y):
         nearest_control_point_index = self.__find_nearest_control_point(x, y)
@@ -111,15 +557,62 @@ class PPItem(QGraphicsItem):
     def update_control_point(self, x, y):
         if self.moving_control_point != -1:
             try:
-                self.p_list[self.moving_control_point] = [x, y]
+                self.set_point(self.moving_control_point, [x, y])
             except IndexError:
                 print("control index out of range!")
         else:
             if self.position is None:
                 return
-            alg.translate(self.p_list, x - self.position[0], y - self.position[1])
+            self.translate(x - self.position[0], y - self.position[1])
             self.position = [x, y]
 
+    def set_point(self, index, point):
+        '''
+        修改一个控制点的坐标，需要增量更新的子类通过geometry_changed得到通知
+        :param index: 控制点索引
+        :param point: 新的坐标[x, y]
+        :return: self
+        '''
+        self.prepare_geometry_change()
+        self.bake_transform()
+        old = self._master[index]
+        self._master[index] = [point[0], point[1]]
+        self._integral = self._integral and float(point[0]).is_integer() and float(point[1]).is_integer()
+        self.update_master_bounds(old, point)
+        self._p_list = None
+        self._vertex_bounds = None
+        index %= len(self._master)
+        if self._point_grid is not None:
+            self._point_grid.move(index, [round(point[0]), round(point[1])])
+        self.geometry_changed(index)
+        return self
+
+    def append_point(self, point):
+        '''
+        在末尾追加一个控制点
+        :param point: 新的坐标[x, y]
+        :return: self
+        '''
+        self.prepare_geometry_change()
+        self.bake_transform()
+        self._master.append([point[0], point[1]])
+        self._integral = self._integral and float(point[0]).is_integer() and float(point[1]).is_integer()
+        self.update_master_bounds(None, point)
+        self._p_list = None
+        self._vertex_bounds = None
+        if self._point_grid is not None:
+            self._point_grid.append([round(point[0]), round(point[1])])
+        self.geometry_changed(len(self._master) - 1)
+        return self
+
+    def geometry_changed(self, index=None):
+        '''
+        控制点发生变化后调用，子类可以重写以更新缓存
+        :param index: 发生变化（或新追加）的控制点索引，为None时表示所有控制点都可能改变
+        :return: None
+        '''
+        pass
+
     def release_control_point(self):
         if self.moving_control_point != -1:
             self.moving_control_point = -1
@@ -129,7 +622,7 @@ class PPItem(QGraphicsItem):
         将当前的 item 转换为一个 dict 用于可持续化
         :return: 转换之后的
         '''
-        params_dict = {'id': self.id, 'type': self.item_type, 'p_list': self.p_list, 'algorithm': self.algorithm,
+        params_dict = {'id': self.id, 'type': self.item_type, 'p_list': self.p_list.tolist(), 'algorithm': self.algorithm,
                        'color': [self.color.red(), self.color.green(), self.color.blue()], 'zvalue': self.zValue()}
         return params_dict
 
@@ -143,13 +636,13 @@ class PPItem(QGraphicsItem):
 
     # translation on item
     def translate(self, dx, dy):
-        self.p_list = alg.translate(self.p_list, dx, dy)
+        self.transform(alg.translate_matrix(dx, dy))
 
     def rotate(self, xc, yc, r):
-        self.p_list = alg.rotate(self.p_list, xc, yc, r)
+        self.transform(alg.rotate_matrix(xc, yc, r))
 
     def scale(self, xc, yc, s):
-        self.p_list = alg.scale(self.p_list, xc, yc, s)
+        self.transform(alg.scale_matrix(xc, yc, s))
 
     # drawing functions of item
     def start_draw(self):
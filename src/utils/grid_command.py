@@ -0,0 +1,30 @@
+from utils.command import Command
+
+
+class GridCommand(Command):
+    """
+    Duplicate the selected item as a grid of instances
+
+    Attributes:
+        rows: number of rows of the grid
+        columns: number of columns of the grid
+        dx: offset between two adjacent columns
+        dy: offset between two adjacent rows
+    """
+    def __init__(self, _app, _canvas):
+        super(GridCommand, self).__init__(_app, _canvas)
+        self.rows = 1
+        self.columns = 1
+        self.dx = 0
+        self.dy = 0
+
+    def set_grid(self, rows, columns, dx, dy):
+        self.rows = rows
+        self.columns = columns
+        self.dx = dx
+        self.dy = dy
+        return self
+
+    def execute(self) -> bool:
+        self.backup = self.canvas.get_context()
+        return self.canvas.duplicate_as_grid(self.rows, self.columns, self.dx, self.dy)
@@ -0,0 +1,53 @@
+import time
+
+
+class InputLatency(object):
+    """
+    Statistics of input latency: the time from the arrival of an input event
+    to the moment its result is applied and the repaint is requested.
+    Events coalesced into one frame are measured from the earliest of them.
+
+    Attributes:
+        received: number of input events received
+        applied: number of times the pending input was applied (at most once per frame)
+        last: latency of the last application (ms)
+        max: max latency (ms)
+        total: sum of all the latencies (ms)
+    """
+    def __init__(self):
+        self.received = 0
+        self.applied = 0
+        self.last = 0.0
+        self.max = 0.0
+        self.total = 0.0
+
+    def record(self, started, count):
+        '''
+        record one application of the pending input
+        :param started: time.perf_counter() when the earliest coalesced event arrived
+        :param count: number of events coalesced into this application
+        :return: self
+        '''
+        self.last = (time.perf_counter() - started) * 1000
+        self.max = max(self.max, self.last)
+        self.total += self.last
+        self.received += count
+        self.applied += 1
+        return self
+
+    def mean(self):
+        return self.total / self.applied if self.applied else 0.0
+
+    def coalesced(self):
+        '''
+        :return: number of events merged into another one instead of being applied on their own
+        '''
+        return self.received - self.applied
+
+    def reset(self):
+        self.__init__()
+        return self
+
+    def __str__(self):
+        return 'input latency: last {:.1f} ms, mean {:.1f} ms, max {:.1f} ms, {} events coalesced into {}'.format(
+            self.last, self.mean(), self.max, self.received, self.applied)